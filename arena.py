@@ -0,0 +1,344 @@
+"""Many snakes on one board.
+
+An Arena runs N snakes, human or bot, over shared food and rewards. Every
+snake writes into one occupancy grid and one free-cell index (the same
+structures a single engine.Snake uses), plus an owner grid saying which
+snake covers each cell. Checking a move is then a single lookup whatever
+is in the way, so a tick costs O(number of snakes), not O(total body
+length x snakes).
+
+A tick has two phases so no snake gets to move first:
+
+1. Every live snake picks its next cell. Leaving the board, entering any
+   body (tails included, as they haven't moved yet) or entering the same
+   cell as another snake is fatal. Nothing moves yet.
+2. The survivors move, eat and collect; then the dead are cleared off the
+   board.
+
+    python arena.py --snakes 200 --board 300x300 --ticks 10000
+"""
+import argparse
+import random
+import sys
+import time
+from array import array
+from collections import Counter
+
+import engine
+from engine import DIRECTIONS, FOOD_POINTS, RIGHT
+
+RESPAWN_DELAY = 16  # Ticks a dead bot waits before rejoining
+SPAWN_ATTEMPTS = 100  # Random spots tried before giving up on placing a snake
+BOT_SAMPLE = 4  # Pieces of food a bot looks at when choosing where to go
+
+
+class ArenaSnake(engine.Snake):
+    """A snake that shares its board with the rest of an arena
+
+    reset() hands the snake's cells back to the shared board instead of
+    making a fresh one; Arena.spawn() puts it back in play.
+    """
+    def __init__(self, arena, snake_id):
+        self.arena = arena
+        self.id = snake_id
+        self.positions = ()
+        self.kills = 0
+        self.deaths = 0
+        super().__init__(arena.grid_width, arena.grid_height)
+
+    def reset(self):
+        self.occupied = self.arena.occupied
+        self.free = self.arena.free
+        owners = self.arena.owners
+        for x, y in self.positions:
+            owners[y * self.grid_width + x] = 0
+        self.set_positions([])
+        self.direction = RIGHT
+        self.score = 0
+        self.speed = engine.FPS
+        self.collision = None
+        self.alive = False
+        self.respawn_at = None  # Tick to come back on, for bots waiting to respawn
+        self.target = None  # Food a bot is heading for
+
+
+class Arena:
+    """N snakes on a grid_width x grid_height board
+
+    Snakes are numbered 0..N-1; owners holds id + 1 for every body cell (0
+    when empty). Turns are queued per snake with queue_turn() or passed to
+    step() directly. With respawn, dead snakes come back after
+    RESPAWN_DELAY ticks with a fresh score; kills and deaths carry over.
+    """
+    snake_class = ArenaSnake
+    food_class = engine.Food
+    reward_class = engine.Reward
+
+    def __init__(self, num_snakes, grid_width=100, grid_height=100, food_count=None,
+                 seed=None, respawn=True):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.rng = random.Random()
+        self.respawn = respawn
+        self.reward_chance = engine.REWARD_CHANCE
+        cells = grid_width * grid_height
+        self.occupied = bytearray(cells)
+        self.free = engine.FreeCells(cells)
+        self.owners = array('l', [0]) * cells
+        self.snakes = [self.snake_class(self, i) for i in range(num_snakes)]
+        self.turns = [engine.TurnQueue() for _ in range(num_snakes)]
+        if food_count is None:
+            food_count = max(1, num_snakes)
+        self.food = [self.food_class(self.rng, grid_width, grid_height) for _ in range(food_count)]
+        self.food_at = {}  # Position -> Food, for every piece on the board
+        self.unplaced = []  # Food there was no room for, tried again every tick
+        self.reward = self.reward_class(self.rng, grid_width, grid_height)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Clear the board and place every snake and piece of food again"""
+        if seed is None:
+            seed = self.rng.getrandbits(64)
+        self.seed = seed
+        self.rng.seed(seed)
+        for snake in self.snakes:
+            snake.reset()
+            snake.kills = 0
+            snake.deaths = 0
+        for turns in self.turns:
+            turns.clear()
+        self.ticks = 0
+        self.reward.active = False
+        self.food_at = {}
+        self.unplaced = [food for food in self.food if not self.place_food(food)]
+        for snake in self.snakes:
+            self.spawn(snake)
+        # What happened during the last tick
+        self.deaths = []  # (snake id, cause, killer id or None)
+        self.ate_food = []  # Ids of the snakes that ate
+        self.reward_collected = {}  # Snake id -> points
+
+    def place_food(self, food):
+        """Put a piece of food on a free cell no other food is on; False if there is none"""
+        for _ in range(SPAWN_ATTEMPTS):
+            if not food.randomize_position(self.free):
+                return False
+            if food.position not in self.food_at:
+                self.food_at[food.position] = food
+                return True
+        return False
+
+    def spawn(self, snake, length=3):
+        """Place a dead snake in a random clear spot, heading into open space"""
+        free = self.free
+        width = self.grid_width
+        for _ in range(SPAWN_ATTEMPTS):
+            index = free.choice(self.rng)
+            if index is None:
+                return False
+            x, y = index % width, index // width
+            dx, dy = self.rng.choice(DIRECTIONS)
+            # The body trails behind the head; keep a few cells ahead clear too
+            cells = [(x - dx * i, y - dy * i) for i in range(-3, length)]
+            if all(0 <= cx < width and 0 <= cy < self.grid_height
+                   and not self.occupied[cy * width + cx] and (cx, cy) not in self.food_at
+                   for cx, cy in cells):
+                break
+        else:
+            return False
+
+        snake.reset()
+        snake.set_positions(cells[3:])
+        snake.direction = (dx, dy)
+        snake.alive = True
+        value = snake.id + 1
+        for cx, cy in snake.positions:
+            self.owners[cy * width + cx] = value
+        return True
+
+    def queue_turn(self, snake_id, direction):
+        snake = self.snakes[snake_id]
+        return self.turns[snake_id].push(direction, snake.direction, self.ticks)
+
+    def kill(self, snake, cause, killer=None):
+        snake.collision = cause
+        snake.deaths += 1
+        self.deaths.append((snake.id, cause, killer))
+        if killer is not None and killer != snake.id:
+            self.snakes[killer].kills += 1
+
+    def step(self, directions=None):
+        """Advance every snake one tick
+
+        directions, if given, has one direction (or None to go straight) per
+        snake; otherwise each snake makes its next queued turn. Returns the
+        number of snakes alive afterwards.
+        """
+        width = self.grid_width
+        height = self.grid_height
+        occupied = self.occupied
+        owners = self.owners
+        self.ticks += 1
+        self.deaths = []
+        self.ate_food = []
+        self.reward_collected = {}
+
+        # Phase 1: where does everyone want to go?
+        claims = {}  # Cell index -> snakes moving into it
+        dying = []
+        for snake in self.snakes:
+            if not snake.alive:
+                continue
+            if directions is not None:
+                direction = directions[snake.id]
+            else:
+                direction = self.turns[snake.id].pop(self.ticks - 1)
+            if direction is not None:
+                snake.change_direction(direction)
+            x, y = snake.positions[0]
+            new_x = x + snake.direction[0]
+            new_y = y + snake.direction[1]
+            if new_x < 0 or new_x >= width or new_y < 0 or new_y >= height:
+                self.kill(snake, "wall")
+                dying.append(snake)
+                continue
+            index = new_y * width + new_x
+            if occupied[index]:
+                owner = owners[index] - 1
+                self.kill(snake, "self" if owner == snake.id else "snake", owner)
+                dying.append(snake)
+                continue
+            claims.setdefault(index, []).append(snake)
+
+        # Phase 2: move the survivors; snakes that went for the same cell all crash
+        food_at = self.food_at
+        reward = self.reward
+        alive = 0
+        for index, claimants in claims.items():
+            if len(claimants) > 1:
+                for snake in claimants:
+                    self.kill(snake, "head-on")
+                    dying.append(snake)
+                continue
+            snake = claimants[0]
+            alive += 1
+            snake.update()  # The cell was free and nobody else claimed it
+            owners[index] = snake.id + 1
+            if snake.last_tail is not None:
+                tail_x, tail_y = snake.last_tail
+                owners[tail_y * width + tail_x] = 0
+
+            head = snake.positions[0]
+            food = food_at.pop(head, None)
+            if food is not None:
+                snake.length += 1
+                snake.score += FOOD_POINTS
+                self.ate_food.append(snake.id)
+                snake.target = None
+                if not self.place_food(food):
+                    self.unplaced.append(food)
+            if reward.active and head == reward.position:
+                snake.score += reward.points
+                snake.length += 1
+                self.reward_collected[snake.id] = reward.points
+                reward.active = False
+
+        # Clear the dead off the board
+        for snake in dying:
+            snake.reset()
+            if self.respawn:
+                snake.respawn_at = self.ticks + RESPAWN_DELAY
+        # Food that found no room before may fit now that cells have been freed
+        if self.unplaced:
+            self.unplaced = [food for food in self.unplaced if not self.place_food(food)]
+
+        reward.update()
+        if not reward.active and self.rng.random() < self.reward_chance:
+            reward.activate(self.free)
+
+        if self.respawn:
+            for snake in self.snakes:
+                if not snake.alive and snake.respawn_at is not None and snake.respawn_at <= self.ticks:
+                    if self.spawn(snake):
+                        alive += 1
+        return alive
+
+
+def greedy_bot(arena, snake):
+    """Head for a piece of food without crashing on the next move
+
+    A bot picks the nearest of a few pieces of food chosen at random and
+    sticks to it until it's gone, so choosing costs the same however much
+    food there is. Cells another head could also enter next tick are only
+    taken when nothing else is safe.
+    """
+    head_x, head_y = snake.positions[0]
+    if snake.target is None or snake.target not in arena.food_at:
+        food = arena.food
+        sample = [food[arena.rng.randrange(len(food))].position for _ in range(BOT_SAMPLE)]
+        snake.target = min(sample, key=lambda p: abs(p[0] - head_x) + abs(p[1] - head_y))
+    target_x, target_y = snake.target
+
+    reverse = (-snake.direction[0], -snake.direction[1])
+    width = arena.grid_width
+    height = arena.grid_height
+    occupied = arena.occupied
+    owners = arena.owners
+    snakes = arena.snakes
+    best = None
+    best_key = None
+    for direction in DIRECTIONS:
+        if direction == reverse:
+            continue
+        x = head_x + direction[0]
+        y = head_y + direction[1]
+        if x < 0 or x >= width or y < 0 or y >= height or occupied[y * width + x]:
+            continue
+        contested = False
+        for dx, dy in DIRECTIONS:
+            nx = x + dx
+            ny = y + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                owner = owners[ny * width + nx]
+                if owner and owner - 1 != snake.id and snakes[owner - 1].positions[0] == (nx, ny):
+                    contested = True
+                    break
+        key = (contested, abs(x - target_x) + abs(y - target_y))
+        if best is None or key < best_key:
+            best = direction
+            best_key = key
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run bot snakes in a shared arena")
+    parser.add_argument("--snakes", type=int, default=100)
+    parser.add_argument("--board", default="200x200", help="WIDTHxHEIGHT")
+    parser.add_argument("--food", type=int, default=None, help="pieces of food (default: one per snake)")
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    width, height = (int(part) for part in args.board.lower().split("x"))
+    arena = Arena(args.snakes, width, height, args.food, seed=args.seed)
+    causes = Counter()
+    alive_total = 0
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        directions = [greedy_bot(arena, snake) if snake.alive else None for snake in arena.snakes]
+        alive_total += arena.step(directions)
+        causes.update(cause for _, cause, _ in arena.deaths)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.ticks} ticks of {args.snakes} snakes on {width}x{height} in {elapsed:.2f}s "
+          f"({args.ticks / elapsed:,.0f} ticks/s, {elapsed / args.ticks * 1e6:.0f} us/tick, "
+          f"{alive_total / args.ticks:.1f} alive on average)")
+    print(f"deaths: {dict(causes)}")
+    best = sorted(arena.snakes, key=lambda snake: (snake.score, snake.kills), reverse=True)[:5]
+    for snake in best:
+        print(f"  snake {snake.id:>4}: score {snake.score:>5}, length {len(snake.positions):>4}, "
+              f"kills {snake.kills}, deaths {snake.deaths}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
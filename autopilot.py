@@ -0,0 +1,431 @@
+"""A bot that plays engine.Game, for attract mode and soak tests.
+
+Autopilot plans with A* and caches the route. It follows the route until
+something invalidates it: the target moves, the snake grows unexpectedly,
+or the head is not where the route says. So most ticks cost O(1) rather
+than a search. The target is an active reward it can reach in time, or
+else the food. How it stays alive depends on the board:
+
+- On a board with a Hamiltonian cycle (an even side), the body is kept in
+  cycle order, tail to head, from the first tick. Routes may only take
+  shortcuts that keep it that way, which makes every move safe; without a
+  route it jumps as far ahead along the cycle as it safely can. Once the
+  snake covers SHORTCUT_LIMIT of the board it follows the cycle strictly,
+  so a game played to the end is a win.
+- Otherwise (or when the body isn't in cycle order, say because a player
+  handed over mid-game), body cells count as open once the tail will have
+  left them by the time the head gets there. A route is taken only if,
+  once the snake has followed it and grown, the head can still reach the
+  tail. With no safe route the snake follows its tail the long way round
+  until one opens up, and it switches to the cycle as soon as the body
+  lines up with one.
+
+    python autopilot.py --games 20 [--board 26x20] [--seed 1]
+"""
+import argparse
+import heapq
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+import engine
+
+SHORTCUT_LIMIT = 0.5  # Share of the board covered after which the cycle is followed strictly
+SHORTCUT_SLACK = 3  # Free cells left ahead of the head, beyond any growing still to do
+ORDER_CHECK_INTERVAL = 64  # Ticks between checks for a cycle the body lies along
+RETRY_INTERVAL = 4  # Ticks between attempts to find a route after the last one failed
+TAIL_WINDOW = 4096  # Tail segments the search treats as moving out of the way
+SEARCH_LIMIT = 20000  # Cells a single search may expand before giving up
+CYCLE_SEARCH_LIMIT = 5000  # The same on a cycle, where greedy shortcuts cover for a failed search
+
+
+class Cycle:
+    """A Hamiltonian cycle of a board with an even side, worked out cell by cell
+
+    Up the first column, then back and forth along the rows (columns, if
+    the height is odd); flip_x, flip_y and backwards give the mirror images
+    and the reverse direction. Nothing is stored, so huge boards are free.
+    """
+    def __init__(self, width, height, flip_x=False, flip_y=False, backwards=False):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.transpose = height % 2 == 1
+        self.flip_x = flip_x
+        self.flip_y = flip_y
+        self.backwards = backwards
+
+    def index(self, x, y):
+        """Position of a cell along the cycle"""
+        if self.flip_x:
+            x = self.width - 1 - x
+        if self.flip_y:
+            y = self.height - 1 - y
+        if self.transpose:
+            x, y = y, x
+            width, height = self.height, self.width
+        else:
+            width, height = self.width, self.height
+        if x == 0:
+            i = y
+        else:
+            row = height - 1 - y
+            i = height + row * (width - 1) + (x - 1 if row % 2 == 0 else width - 1 - x)
+        return (self.size - i) % self.size if self.backwards else i
+
+    def cell(self, i):
+        """The cell at a position along the cycle"""
+        i %= self.size
+        if self.backwards:
+            i = (self.size - i) % self.size
+        width, height = (self.height, self.width) if self.transpose else (self.width, self.height)
+        if i < height:
+            x, y = 0, i
+        else:
+            row, offset = divmod(i - height, width - 1)
+            y = height - 1 - row
+            x = 1 + offset if row % 2 == 0 else width - 1 - offset
+        if self.transpose:
+            x, y = y, x
+        if self.flip_x:
+            x = self.width - 1 - x
+        if self.flip_y:
+            y = self.height - 1 - y
+        return x, y
+
+    def in_order(self, positions):
+        """Whether a body (head first) lies in cycle order from its tail to its head"""
+        cells = reversed(positions)
+        tail = self.index(*next(cells))
+        previous = 0
+        for x, y in cells:
+            distance = (self.index(x, y) - tail) % self.size
+            if distance <= previous:
+                return False
+            previous = distance
+        return True
+
+
+def find_cycle(width, height, positions):
+    """A Cycle of the board that the body lies along, or None"""
+    if width % 2 and height % 2:
+        return None
+    for flip_x in (False, True):
+        for flip_y in (False, True):
+            for backwards in (False, True):
+                cycle = Cycle(width, height, flip_x, flip_y, backwards)
+                if cycle.in_order(positions):
+                    return cycle
+    return None
+
+
+class Autopilot:
+    """Steers one engine.Game; call it once per tick for the next direction
+
+    It notices when the game has been reset, so one Autopilot can play any
+    number of games in a row.
+    """
+    def __init__(self, game):
+        self.game = game
+        self.cells = game.grid_width * game.grid_height
+        self.searches = 0
+        self.reset()
+
+    def reset(self):
+        game = self.game
+        self.seed = game.seed
+        self.ticks = game.ticks
+        self.path = deque()  # Cells still to visit
+        self.path_key = None  # What the cached path was planned for
+        self.expected_head = None
+        self.retry_at = 0
+        self.cycle = find_cycle(game.grid_width, game.grid_height, game.snake.positions)
+        self.order_check_at = game.ticks + ORDER_CHECK_INTERVAL
+
+    def __call__(self):
+        game = self.game
+        if game.seed != self.seed or game.ticks < self.ticks:
+            self.reset()
+        self.ticks = game.ticks
+        snake = game.snake
+        head = snake.positions[0]
+        reward = game.reward
+        key = (reward.position if reward.active else None, game.food.position, snake.length)
+        if head != self.expected_head or key != self.path_key:
+            self.path.clear()
+
+        if self.cycle is None and game.ticks >= self.order_check_at:
+            self.order_check_at = game.ticks + ORDER_CHECK_INTERVAL
+            self.cycle = find_cycle(game.grid_width, game.grid_height, snake.positions)
+            self.path.clear()
+        if self.cycle is not None:
+            return self._cycle_move(head, key)
+
+        if not self.path and (key != self.path_key or game.ticks >= self.retry_at):
+            self._plan(key)
+        if self.path:
+            return self._next_on_path(head)
+        # Nothing safe to eat for now; look again in a few ticks
+        self.expected_head = None
+        return self._follow_tail(head) or self._roomiest_move(head)
+
+    def _next_on_path(self, head):
+        cell = self.expected_head = self.path.popleft()
+        return (cell[0] - head[0], cell[1] - head[1])
+
+    def _targets(self):
+        """(goal, deadline in ticks or None) pairs, best first"""
+        game = self.game
+        targets = []
+        if game.reward.active:
+            targets.append((game.reward.position, game.reward.timer))
+        targets.append((game.food.position, None))
+        return targets
+
+    # On a cycle
+
+    def _cycle_move(self, head, key):
+        """Next cell along the route if it keeps the body in order, else along the cycle"""
+        game = self.game
+        snake = game.snake
+        cycle = self.cycle
+        here = cycle.index(*head)
+        growing = snake.length - len(snake.positions)
+        limit = (cycle.index(*snake.positions[-1]) - here) % cycle.size - growing - SHORTCUT_SLACK
+
+        self.expected_head = None
+        x, y = cycle.cell(here + 1)
+        best = (x - head[0], y - head[1])
+        if len(snake.positions) >= SHORTCUT_LIMIT * self.cells:
+            return best
+
+        targets = self._targets()
+        if key != self.path_key:
+            # One search per target; if it fails, the greedy jumps below get there anyway
+            self.path_key = key
+            for goal, deadline in targets:
+                path = self._cycle_search(head, goal, here, limit)
+                if path and (deadline is None or len(path) <= deadline):
+                    self.path = deque(path)
+                    break
+        if self.path:
+            x, y = self.path[0]
+            if 0 < (cycle.index(x, y) - here) % cycle.size <= limit:
+                return self._next_on_path(head)
+            self.path.clear()
+
+        # No route (yet): jump as far along the cycle as is safe, short of the target
+        width = game.grid_width
+        height = game.grid_height
+        reach = min(limit, (cycle.index(*targets[0][0]) - here) % cycle.size)
+        best_distance = 1
+        for dx, dy in engine.DIRECTIONS:
+            x = head[0] + dx
+            y = head[1] + dy
+            if x < 0 or x >= width or y < 0 or y >= height or snake.occupied[y * width + x]:
+                continue
+            distance = (cycle.index(x, y) - here) % cycle.size
+            if best_distance < distance <= reach:
+                best = (dx, dy)
+                best_distance = distance
+        return best
+
+    def _cycle_search(self, start, goal, here, limit):
+        """A* over moves that only go forward along the cycle, at most limit cells ahead"""
+        self.searches += 1
+        cycle = self.cycle
+        size = cycle.size
+        goal_x, goal_y = goal
+        if not 0 < (cycle.index(goal_x, goal_y) - here) % size <= limit:
+            return None
+        return self._astar(start, goal, lambda x, y, ahead, steps: (
+            ahead < (cycle.index(x, y) - here) % size <= limit), lambda x, y: (cycle.index(x, y) - here) % size,
+            CYCLE_SEARCH_LIMIT)
+
+    # Off the cycle
+
+    def _plan(self, key):
+        game = self.game
+        snake = game.snake
+        head = snake.positions[0]
+        vacate = self._vacate_times()
+        self.path_key = key
+        self.retry_at = game.ticks + RETRY_INTERVAL
+        for goal, deadline in self._targets():
+            path = self._search(head, goal, snake.occupied, vacate)
+            if path and (deadline is None or len(path) <= deadline) and self._safe_after(path):
+                self.path = deque(path)
+                return
+
+    def _vacate_times(self):
+        """Tail cells -> the first step on which the head may enter them"""
+        snake = self.game.snake
+        growing = snake.length - len(snake.positions)
+        vacate = {}
+        width = self.game.grid_width
+        # The tail leaves its cell during the next move, which is too late for
+        # a head arriving on that same move
+        for step, (x, y) in enumerate(islice(reversed(snake.positions), TAIL_WINDOW)):
+            vacate[y * width + x] = step + 2 + growing
+        return vacate
+
+    def _search(self, start, goal, occupied, vacate):
+        """A* over open cells and those the tail will have left in time"""
+        self.searches += 1
+        width = self.game.grid_width
+        return self._astar(start, goal, lambda x, y, ahead, steps: (
+            not occupied[y * width + x] or vacate.get(y * width + x, steps + 1) <= steps), None)
+
+    def _astar(self, start, goal, allowed, progress, budget=SEARCH_LIMIT):
+        """Shortest route from start to goal; the cells after start, or None
+
+        allowed(x, y, progress of the cell we come from, steps to get there)
+        says whether a move may enter a cell; progress(x, y), if given, is
+        carried along for it. Gives up after expanding budget cells.
+        """
+        width = self.game.grid_width
+        height = self.game.grid_height
+        goal_x, goal_y = goal
+        goal_index = goal_y * width + goal_x
+        start_index = start[1] * width + start[0]
+        best = {start_index: 0}
+        came_from = {}
+        heap = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), 0, start_index, 0)]
+        expanded = 0
+        while heap:
+            _, steps, index, ahead = heapq.heappop(heap)
+            steps = -steps
+            if index == goal_index:
+                path = []
+                while index != start_index:
+                    path.append((index % width, index // width))
+                    index = came_from[index]
+                path.reverse()
+                return path
+            if steps > best[index]:
+                continue
+            expanded += 1
+            if expanded > budget:
+                return None
+            x = index % width
+            y = index // width
+            steps += 1
+            for nx, ny in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+                if nx < 0 or nx >= width or ny < 0 or ny >= height or not allowed(nx, ny, ahead, steps):
+                    continue
+                neighbor = ny * width + nx
+                if steps < best.get(neighbor, steps + 1):
+                    best[neighbor] = steps
+                    came_from[neighbor] = index
+                    # Ties go to the deeper node, which reaches the goal sooner
+                    heapq.heappush(heap, (steps + abs(nx - goal_x) + abs(ny - goal_y), -steps, neighbor,
+                                          progress(nx, ny) if progress else 0))
+        return None
+
+    def _safe_after(self, path):
+        """Whether the head could still reach the tail after following path and eating"""
+        snake = self.game.snake
+        positions = snake.positions
+        width = self.game.grid_width
+        moves = len(path)
+        size = min(len(positions) + moves, snake.length)  # Body length on arrival
+
+        occupied = bytearray(snake.occupied)
+        kept = size - moves  # Old segments still on the board on arrival
+        for x, y in islice(reversed(positions), len(positions) - max(kept, 0)):
+            occupied[y * width + x] = 0
+        for x, y in path:
+            occupied[y * width + x] = 1
+        tail = path[moves - size] if kept <= 0 else positions[kept - 1]
+
+        # Having just eaten, the snake grows on the next move, so its tail
+        # stays put for one more tick
+        x, y = tail
+        return self._search(path[-1], tail, occupied, {y * width + x: 3}) is not None
+
+    def _follow_tail(self, head):
+        """The move with the longest way round to the tail, among those that keep it in reach
+
+        Taking the long way wastes time safely while the body moves out of
+        the way of the food.
+        """
+        game = self.game
+        snake = game.snake
+        width = game.grid_width
+        height = game.grid_height
+        occupied = snake.occupied
+        # One tick later, everything vacates a step sooner
+        vacate = {cell: step - 1 for cell, step in self._vacate_times().items()}
+        tail = snake.positions[-1]
+        best = None
+        best_length = 0
+        for dx, dy in engine.DIRECTIONS:
+            x = head[0] + dx
+            y = head[1] + dy
+            if x < 0 or x >= width or y < 0 or y >= height or occupied[y * width + x]:
+                continue
+            path = self._search((x, y), tail, occupied, vacate)
+            if path is not None and len(path) > best_length:
+                best = (dx, dy)
+                best_length = len(path)
+        return best
+
+    def _roomiest_move(self, head):
+        """The open neighbor with the most open neighbors of its own, or None"""
+        snake = self.game.snake
+        width = self.game.grid_width
+        height = self.game.grid_height
+        occupied = snake.occupied
+        best = None
+        best_room = -1
+        for dx, dy in engine.DIRECTIONS:
+            x = head[0] + dx
+            y = head[1] + dy
+            if x < 0 or x >= width or y < 0 or y >= height or occupied[y * width + x]:
+                continue
+            room = sum(1 for ex, ey in engine.DIRECTIONS
+                       if 0 <= x + ex < width and 0 <= y + ey < height and not occupied[(y + ey) * width + x + ex])
+            if room > best_room:
+                best = (dx, dy)
+                best_room = room
+        return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test the autopilot")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--board", default=f"{engine.GRID_WIDTH}x{engine.GRID_HEIGHT}", help="WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-ticks", type=int, default=10000000)
+    args = parser.parse_args()
+    width, height = (int(part) for part in args.board.lower().split("x"))
+
+    game = engine.Game(width, height, seed=args.seed)
+    pilot = Autopilot(game)
+    wins = 0
+    for number in range(args.games):
+        if number:
+            game.reset()
+        searches = pilot.searches
+        slowest = 0.0
+        thinking = 0.0
+        while game.ticks < args.max_ticks:
+            start = time.perf_counter()
+            direction = pilot()
+            elapsed = time.perf_counter() - start
+            thinking += elapsed
+            slowest = max(slowest, elapsed)
+            if not game.step(direction):
+                break
+        wins += game.won
+        cause = "won" if game.won else game.death_cause or "stopped"
+        print(f"game {number + 1}: {cause} after {game.ticks} ticks, length {len(game.snake.positions)} "
+              f"({len(game.snake.positions) / (width * height):.0%} of the board), "
+              f"{thinking / max(1, game.ticks) * 1e6:.0f} us/tick on average, slowest {slowest * 1000:.1f} ms, "
+              f"{pilot.searches - searches} searches{'' if pilot.cycle else ', off the cycle'}")
+    print(f"{wins}/{args.games} games won")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Game ticks per second: BatchGame against a Python loop over engine.Game.
+
+Both sides play random moves on the default board and restart finished
+games, so the numbers include deaths, eating and respawning.
+
+    python benchmarks/bench_batch_env.py [--games 256 512] [--steps 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import engine
+from batch_env import BatchGame
+
+
+def bench_engine(ticks):
+    game = engine.Game(seed=0)
+    rng = random.Random(0)
+    moves = [rng.choice(engine.DIRECTIONS) for _ in range(1024)]
+    start = time.perf_counter()
+    for i in range(ticks):
+        if not game.step(moves[i & 1023]):
+            game.reset()
+    return ticks / (time.perf_counter() - start)
+
+
+def bench_batch(games, steps):
+    batch = BatchGame(games, seed=0)
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 4, (64, games))
+    start = time.perf_counter()
+    for i in range(steps):
+        batch.step(actions[i & 63])
+    return games * steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, nargs="+", default=[64, 256, 512, 1024, 4096])
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+
+    single = bench_engine(200000)
+    print(f"{'engine.Game loop':>18} {single:>12,.0f} ticks/s")
+    for games in args.games:
+        rate = bench_batch(games, args.steps)
+        print(f"{'BatchGame x' + str(games):>18} {rate:>12,.0f} ticks/s  ({rate / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
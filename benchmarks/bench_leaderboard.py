@@ -0,0 +1,61 @@
+"""Leaderboard latency with a million or more entries.
+
+Bulk-imports random scores into a fresh database, then times single
+submissions and the rank, top-K and page-around queries. Runs twice: with
+few distinct scores (multiples of 10 below 5000, as the game gives) and
+with almost every score distinct (random below a billion), where most
+submissions are a score the rank index hasn't seen.
+
+    python benchmarks/bench_leaderboard.py [--entries 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboard import Leaderboard
+
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    per_call = (time.perf_counter() - start) / repeat
+    print(f"{label:>22} {per_call * 1e6:>10.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases = (("few distinct scores", lambda rng: rng.randrange(0, 5000, 10)),
+             ("almost all distinct", lambda rng: rng.randrange(0, 10 ** 9)))
+    for label, random_score in cases:
+        rng = random.Random(0)
+        with tempfile.TemporaryDirectory() as directory:
+            leaderboard = Leaderboard(os.path.join(directory, "leaderboard.db"))
+
+            start = time.perf_counter()
+            leaderboard.import_scores((f"player{i}", random_score(rng)) for i in range(args.entries))
+            elapsed = time.perf_counter() - start
+            distinct = leaderboard.db.execute("SELECT COUNT(*) FROM score_counts").fetchone()[0]
+            print(f"{label}: {distinct:,} of {args.entries:,} entries")
+            print(f"{'bulk import':>22} {elapsed:>10.2f} s")
+
+            ids = [rng.randrange(1, args.entries + 1) for _ in range(args.repeat)]
+            scores = [random_score(rng) for _ in range(args.repeat)]
+            timed("submit", lambda i: leaderboard.submit("bench", scores[i]), args.repeat)
+            timed("rank of score", lambda i: leaderboard.rank(scores[i]), args.repeat)
+            timed("top 10", lambda i: leaderboard.top(10), args.repeat)
+            timed("page around entry", lambda i: leaderboard.around(ids[i], 5), args.repeat)
+            leaderboard.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Clones and rollouts per second, lookahead.GameState against copy.deepcopy.
+
+Plays a game with the autopilot until the snake has --length segments,
+then times cloning that position and playing random rollouts of --depth
+ticks from it, once with GameState.clone()/step() and once with
+copy.deepcopy() of the engine.Game. First it checks GameState keeps to the
+engine's rules: from every position of a few games, one step of each must
+agree until something spawns.
+
+    python benchmarks/bench_lookahead.py [--board 26x20] [--length 100] [--depth 20]
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+from autopilot import Autopilot
+from lookahead import GameState
+from rollout import greedy_policy
+
+
+def check(width, height, games):
+    """Step a GameState alongside each tick of some games; return the number of disagreements"""
+    wrong = 0
+    for seed in range(games):
+        game = engine.Game(width, height, seed=seed)
+        while True:
+            state = GameState.from_game(game)
+            direction = greedy_policy(game)
+            alive = game.step(direction)
+            if state.step(direction) != alive and not game.won:
+                wrong += 1
+            elif alive and (list(state.positions()) != list(game.snake.positions)
+                            or state.score != game.snake.score or state.length != game.snake.length
+                            or (not game.ate_food and state.food != game.food.position)):
+                wrong += 1
+            if not alive:
+                break
+    return wrong
+
+
+def random_rollout(state, depth, rng):
+    """Play up to depth random ticks from a GameState; return the score gained"""
+    score = state.score
+    for _ in range(depth):
+        if not state.step(rng.choice(engine.DIRECTIONS)):
+            break
+    return state.score - score
+
+
+def random_rollout_game(game, depth, rng):
+    score = game.snake.score
+    for _ in range(depth):
+        if not game.step(rng.choice(engine.DIRECTIONS)):
+            break
+    return game.snake.score - score
+
+
+def rate(count, function):
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--board", default=f"{engine.GRID_WIDTH}x{engine.GRID_HEIGHT}", help="WIDTHxHEIGHT")
+    parser.add_argument("--length", type=int, default=100, help="snake length to search from")
+    parser.add_argument("--depth", type=int, default=20, help="ticks per rollout")
+    parser.add_argument("--clones", type=int, default=100000)
+    parser.add_argument("--rollouts", type=int, default=10000)
+    parser.add_argument("--check-games", type=int, default=20)
+    args = parser.parse_args()
+    width, height = (int(part) for part in args.board.lower().split("x"))
+
+    wrong = check(width, height, args.check_games)
+    print(f"{args.check_games} games checked tick by tick: {wrong} disagreements")
+
+    game = engine.Game(width, height, seed=0)
+    pilot = Autopilot(game)
+    while len(game.snake.positions) < args.length and game.step(pilot()):
+        pass
+    root = GameState.from_game(game)
+    deep_clones = max(1, args.clones // 100)
+    deep_rollouts = max(1, args.rollouts // 20)
+    rng = random.Random(0)
+
+    print(f"{width}x{height} board, snake of {len(game.snake.positions)}, rollouts of {args.depth} ticks")
+    print(f"{'':>10} {'clones/s':>12} {'rollouts/s':>12}")
+    state_clones = rate(args.clones, root.clone)
+    state_rollouts = rate(args.rollouts, lambda: random_rollout(root.clone(), args.depth, rng))
+    print(f"{'GameState':>10} {state_clones:>12,.0f} {state_rollouts:>12,.0f}")
+    deep_clone_rate = rate(deep_clones, lambda: copy.deepcopy(game))
+    deep_rollout_rate = rate(deep_rollouts, lambda: random_rollout_game(copy.deepcopy(game), args.depth, rng))
+    print(f"{'deepcopy':>10} {deep_clone_rate:>12,.0f} {deep_rollout_rate:>12,.0f}")
+    print(f"{'speedup':>10} {state_clones / deep_clone_rate:>11.0f}x {state_rollouts / deep_rollout_rate:>11.0f}x")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
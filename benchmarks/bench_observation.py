@@ -0,0 +1,76 @@
+"""Observation encoding cost per game tick, incremental against from scratch.
+
+Plays a batch of games with the rollout bot (restarting finished ones) and
+times BatchEncoder.update() against building each observation anew in
+fresh arrays, the way a naive encoder would. Also reports the memory
+allocated per incremental update, which should be none that grows with
+the batch or the board.
+
+    python benchmarks/bench_observation.py [--games 1 64 256] [--ticks 200]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import engine
+from observation import CHANNELS, FEATURES, BatchEncoder, ObservationEncoder
+from rollout import greedy_policy
+
+
+def play(games, ticks, tick_callback):
+    """Step every game ticks times, calling tick_callback() after each round; return its total time"""
+    total = 0.0
+    for _ in range(ticks):
+        for game in games:
+            if not game.step(greedy_policy(game)):
+                game.reset()
+        start = time.perf_counter()
+        tick_callback()
+        total += time.perf_counter() - start
+    return total
+
+
+def from_scratch(games):
+    grids = np.zeros((len(games), len(CHANNELS), games[0].grid_height, games[0].grid_width), dtype=np.float32)
+    features = np.zeros((len(games), len(FEATURES)), dtype=np.float32)
+    for i, game in enumerate(games):
+        encoder = ObservationEncoder(game, grids[i], features[i])
+        encoder.update()
+    return grids, features
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, nargs="+", default=[1, 64, 256])
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--board", default="40x30", help="WIDTHxHEIGHT")
+    args = parser.parse_args()
+    width, height = (int(part) for part in args.board.lower().split("x"))
+
+    print(f"{'games':>6} {'incremental':>14} {'from scratch':>14} {'peak bytes':>13}")
+    for count in args.games:
+        games = [engine.Game(width, height, seed=i) for i in range(count)]
+        batch = BatchEncoder(games)
+        incremental = play(games, args.ticks, batch.update)
+
+        tracemalloc.start()
+        play(games, 1, lambda: None)
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        batch.update()
+        allocated = tracemalloc.get_traced_memory()[1] - before  # Most held at once during the update
+        tracemalloc.stop()
+
+        scratch = play(games, args.ticks, lambda: from_scratch(games))
+        per_game = 1e6 / (count * args.ticks)
+        print(f"{count:>6} {incremental * per_game:>11.2f} us {scratch * per_game:>11.2f} us {allocated:>13}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Memory and speed of the snake's body, deque of tuples against PackedBody.
+
+Builds bodies of each --lengths along a serpentine path of a --board sized
+square board and reports the bytes each segment takes (as tracemalloc sees
+it, tuples and their ints included), how fast each body can be iterated,
+and Snake.update ticks per second with either body.
+
+    python benchmarks/bench_packed_body.py [--board 2000] [--lengths 10000 1000000 3999999]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_snake_update import time_ticks
+from engine import PackedBody
+
+
+def serpentine(size, length):
+    """length cells of a path boustrophedon across the board, head first"""
+    for i in range(length - 1, -1, -1):
+        y, x = divmod(i, size)
+        yield (x if y % 2 == 0 else size - 1 - x), y
+
+
+def measure(body_class, size, length):
+    """(bytes per segment, segments iterated per second) for one body"""
+    gc.collect()
+    tracemalloc.start()
+    body = body_class(serpentine(size, length))
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in body:
+        pass
+    elapsed = time.perf_counter() - start
+    del body
+    return allocated / length, length / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--board", type=int, default=2000, help="board width and height")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10000, 1000000, 3999999])
+    parser.add_argument("--ticks", type=int, default=200000, help="ticks timed on a 200x200 board")
+    args = parser.parse_args()
+
+    print(f"{'length':>10} {'body':>10} {'bytes/segment':>14} {'segments/s iterated':>20}")
+    for length in args.lengths:
+        for name, body_class in (("deque", deque), ("packed", PackedBody)):
+            per_segment, rate = measure(body_class, args.board, length)
+            print(f"{length:>10} {name:>10} {per_segment:>14.2f} {rate:>20,.0f}")
+
+    print(f"\n{'length':>10} {'body':>10} {'ns/tick':>10}")
+    for length in (3, 20000, 39999):
+        for name, packed in (("deque", False), ("packed", True)):
+            per_tick = time_ticks(200, length, args.ticks, packed)
+            print(f"{length:>10} {name:>10} {per_tick * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Many spectators on one game server, all on localhost.
+
+Starts a server.Server in-process (the snake steered by the rollout bot,
+ticking faster than a real game), connects --clients spectators that
+rebuild the game from its deltas, plus --slow ones with tiny receive
+buffers that barely read. The server's per-client buffers are shrunk to
+--buffer bytes so the slow ones fall behind within seconds. Reports the tick rate the server kept up, bytes
+per tick per client, how often the slow clients were resynced and peak
+memory, then checks every fast spectator ended up with exactly the
+server's game.
+
+    python benchmarks/bench_server.py [--clients 300] [--slow 20] [--seconds 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+from rollout import greedy_policy
+
+SLOW_BUFFER = 4096  # Receive buffer of a slow spectator
+SLOW_READ = 256  # Bytes a slow spectator reads...
+SLOW_PAUSE = 0.5  # ...every this many seconds
+
+
+class BotServer(server.Server):
+    def tick(self, now):
+        if not self.game.game_over:
+            self.game.queue_turn(greedy_policy(self.game) or self.game.snake.direction)
+        super().tick(now)
+
+
+async def spectator(port, mirror, counts):
+    reader, writer = await asyncio.open_connection(server.HOST, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            counts["bytes"] += len(line)
+            mirror.apply(json.loads(line))
+    finally:
+        writer.close()
+
+
+async def slow_spectator(port):
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SLOW_BUFFER)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (server.HOST, port))
+    reader, writer = await asyncio.open_connection(sock=sock, limit=SLOW_BUFFER)
+    try:
+        while await reader.read(SLOW_READ):
+            await asyncio.sleep(SLOW_PAUSE)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    server.WRITE_BUFFER = server.SOCKET_BUFFER = args.buffer
+    host = BotServer(args.width, args.height, seed=args.seed, tick_rate=args.tick_rate)
+    listener = await host.listen(server.HOST, 0)
+    port = listener.sockets[0].getsockname()[1]
+
+    mirrors = [server.Mirror() for _ in range(args.clients)]
+    counts = {"bytes": 0}
+    tasks = [asyncio.create_task(spectator(port, mirror, counts)) for mirror in mirrors]
+    tasks += [asyncio.create_task(slow_spectator(port)) for _ in range(args.slow)]
+    while len(host.clients) < args.clients + args.slow:
+        await asyncio.sleep(0.01)
+
+    ticks = 0
+    original_tick = host.tick
+
+    def counted_tick(now):
+        nonlocal ticks
+        ticks += 1
+        original_tick(now)
+
+    host.tick = counted_tick
+    start = time.perf_counter()
+    ticker = asyncio.create_task(host.run())
+    await asyncio.sleep(args.seconds)
+    ticker.cancel()
+    elapsed = time.perf_counter() - start
+    resynced = sum(1 for client in host.clients if client.resyncs)
+    resyncs = sum(client.resyncs for client in host.clients)
+    dropped = args.clients + args.slow - len(host.clients)
+
+    # Let the fast spectators catch up, then compare them with the server
+    game = host.game
+    final_tick = game.ticks
+    deadline = time.perf_counter() + 5
+    while any(mirror.tick != final_tick for mirror in mirrors) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    expected = (list(game.snake.positions), game.food.position, game.snake.score)
+    wrong = sum((list(mirror.snake), mirror.food, mirror.score) != expected for mirror in mirrors)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    while host.clients and time.perf_counter() < deadline + 5:
+        await asyncio.sleep(0.05)  # The server notices the clients left
+    listener.close()
+    await listener.wait_closed()
+
+    state_size = len(host.snapshot())
+    print(f"{ticks} ticks in {elapsed:.1f}s ({ticks / elapsed:.0f}/s of {args.tick_rate:g}/s asked) "
+          f"for {args.clients} spectators + {args.slow} slow ones")
+    print(f"{counts['bytes'] / max(1, ticks) / max(1, args.clients):.1f} bytes per tick per spectator "
+          f"(a full state is now {state_size} bytes)")
+    print(f"{resyncs} resyncs across {resynced} clients, {dropped} clients dropped; "
+          f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+    print(f"{args.clients - wrong}/{args.clients} spectators match the server at tick {final_tick}")
+    return 1 if wrong else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--slow", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--tick-rate", type=float, default=100)
+    parser.add_argument("--board", default="40x30", help="WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--buffer", type=int, default=4096, help="server buffers per client, in bytes")
+    args = parser.parse_args()
+    args.width, args.height = (int(part) for part in args.board.lower().split("x"))
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
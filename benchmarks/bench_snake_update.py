@@ -0,0 +1,66 @@
+"""Per-tick cost of Snake.update as the snake gets longer.
+
+The snake is laid along a Hamiltonian cycle of the board and steered
+around it, so it never dies and its length stays fixed while we time it.
+With an occupancy grid the cost per tick should stay flat from a
+3-segment snake up to one that fills the board.
+
+    python benchmarks/bench_snake_update.py [--size 200] [--ticks 200000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+
+
+def hamiltonian_cycle(width, height):
+    """Cells of a closed tour of a board with an even height"""
+    cycle = [(0, y) for y in range(height)]  # Up the first column...
+    for y in range(height - 1, -1, -1):  # ...then snake back through the rest
+        xs = range(1, width) if (height - 1 - y) % 2 == 0 else range(width - 1, 0, -1)
+        cycle.extend((x, y) for x in xs)
+    return cycle
+
+
+def time_ticks(size, length, ticks, packed=False):
+    cycle = hamiltonian_cycle(size, size)
+    snake = engine.Snake(size, size, packed)
+    # Head at cycle[length - 1], tail at cycle[0]
+    snake.set_positions(reversed(cycle[:length]))
+
+    # Precompute the direction to take from every cell of the tour
+    turn = {}
+    for i, (x, y) in enumerate(cycle):
+        nx, ny = cycle[(i + 1) % len(cycle)]
+        turn[(x, y)] = (nx - x, ny - y)
+
+    update = snake.update
+    positions = snake.positions
+    start = time.perf_counter()
+    for _ in range(ticks):
+        snake.direction = turn[positions[0]]
+        if not update():
+            raise RuntimeError("snake crashed at length %d" % length)
+    return (time.perf_counter() - start) / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200, help="board width and height (even)")
+    parser.add_argument("--ticks", type=int, default=200000)
+    args = parser.parse_args()
+
+    cells = args.size * args.size
+    lengths = [3, 100, 1000, cells // 10, cells // 2, cells - 1]
+    print(f"{'length':>10} {'fill':>7} {'ns/tick':>10}")
+    for length in lengths:
+        per_tick = time_ticks(args.size, length, args.ticks)
+        print(f"{length:>10} {length / cells:>7.1%} {per_tick * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""The benchmark suite: simulation, rendering and scoreboard I/O in one run.
+
+Measures
+- headless Snake.update ticks/sec at several snake lengths
+- food and reward spawn cost at several board fill ratios
+- Snake.render and Reward.render on an offscreen surface (dummy SDL driver),
+  including a 1000x1000 board seen through the scrolling camera
+- load_scoreboard and Scoreboard() at several file sizes, and Scoreboard.add + flush
+
+Each timing is the best of --repeat runs. Results go to a JSON file;
+given a baseline from an earlier run, any metric that got worse by more
+than --threshold is reported and the exit status is 1.
+
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --baseline results.json [--threshold 0.1]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+# Rendering runs without a window or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+from bench_snake_update import hamiltonian_cycle, time_ticks
+from scoreboard import Scoreboard, load_scoreboard, save_scoreboard
+
+UPDATE_BOARD = 100  # Board size for the update benchmark
+UPDATE_LENGTHS = (3, 100, 1000, 5000, 9999)
+FILL_RATIOS = (0.0, 0.5, 0.9, 0.99)
+RENDER_LENGTHS = (3, 100, 500)
+CAMERA_BOARD = 1000  # Board size for the scrolling camera benchmark
+CAMERA_LENGTHS = (3, 10000, 500000)
+SCOREBOARD_SIZES = (10, 1000, 100000)
+
+
+def best_per_call(func, number, repeat):
+    """Fastest time per call of func() over repeat batches of number calls"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def bench_update(results, scale, repeat):
+    for length in UPDATE_LENGTHS:
+        per_tick = min(time_ticks(UPDATE_BOARD, length, 20000 * scale) for _ in range(repeat))
+        results[f"update.ticks_per_sec.len{length}"] = (1 / per_tick, "ticks/s", True)
+
+
+def bench_spawn(results, scale, repeat):
+    size = UPDATE_BOARD
+    cycle = hamiltonian_cycle(size, size)
+    rng = random.Random(0)
+    for fill in FILL_RATIOS:
+        snake = engine.Snake(size, size)
+        snake.set_positions(reversed(cycle[:max(3, int(fill * size * size))]))
+        food = engine.Food(rng, size, size)
+        reward = engine.Reward(rng, size, size)
+        free = snake.free
+        results[f"spawn.food.fill{fill:.0%}"] = (
+            best_per_call(lambda: food.randomize_position(free), 10000 * scale, repeat), "s", False)
+        results[f"spawn.reward.fill{fill:.0%}"] = (
+            best_per_call(lambda: reward.activate(free), 10000 * scale, repeat), "s", False)
+
+
+def bench_render(results, scale, repeat):
+    import pygame
+    import snake_game
+
+    snake_game.app.start()
+    surface = pygame.Surface((snake_game.WIDTH, snake_game.HEIGHT))
+    cycle = hamiltonian_cycle(snake_game.GRID_WIDTH, snake_game.GRID_HEIGHT)
+    for length in RENDER_LENGTHS:
+        snake = snake_game.Snake(snake_game.GRID_WIDTH, snake_game.GRID_HEIGHT)
+        snake.set_positions(reversed(cycle[:length]))
+        results[f"render.snake.len{length}"] = (
+            best_per_call(lambda: snake.render(surface), 200 * scale, repeat), "s", False)
+
+    # A huge snake on a huge board, seen through the camera: only the view should count
+    board = CAMERA_BOARD
+    cycle = hamiltonian_cycle(board, board)
+    camera = snake_game.Camera(board, board)
+    camera.follow((board // 2, board // 2))
+    for length in CAMERA_LENGTHS:
+        snake = snake_game.Snake(board, board)
+        snake.set_positions(reversed(cycle[:length]))
+        results[f"render.snake.camera.len{length}"] = (
+            best_per_call(lambda: snake.render(surface, camera=camera), 200 * scale, repeat), "s", False)
+
+    reward = snake_game.Reward(random.Random(0), snake_game.GRID_WIDTH, snake_game.GRID_HEIGHT)
+    reward.active = True
+    reward.position = (snake_game.GRID_WIDTH // 2, snake_game.GRID_HEIGHT // 2)
+    results["render.reward"] = (best_per_call(lambda: reward.render(surface), 1000 * scale, repeat), "s", False)
+
+
+def bench_scoreboard(results, scale, repeat):
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SCOREBOARD_SIZES:
+            path = os.path.join(directory, f"scoreboard{size}.json")
+            save_scoreboard({"high_scores": [{"name": f"player{i}", "score": rng.randrange(0, 5000, 10)}
+                                             for i in range(size)]}, path)
+            number = max(1, 100000 * scale // size)
+            results[f"scoreboard.load.entries{size}"] = (
+                best_per_call(lambda: load_scoreboard(path), number, repeat), "s", False)
+            results[f"scoreboard.open.entries{size}"] = (
+                best_per_call(lambda: Scoreboard(path), number, repeat), "s", False)
+
+        # The board only ever writes its top entries back, so one size covers adding
+        board = Scoreboard(os.path.join(directory, "scoreboard.json"))
+        scores = itertools.count(10 ** 6)  # Always a new best score, so every add writes
+
+        def add():
+            board.add("bench", next(scores))
+            board.flush(wait=True)
+
+        results["scoreboard.add_and_flush"] = (best_per_call(add, 20 * scale, repeat), "s", False)
+
+
+BENCHMARKS = {
+    "update": bench_update,
+    "spawn": bench_spawn,
+    "render": bench_render,
+    "scoreboard": bench_scoreboard,
+}
+
+
+def compare(results, baseline, threshold):
+    """Print each metric against the baseline; return the names of the regressions"""
+    regressions = []
+    print(f"{'metric':<36} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["value"]
+        now = result["value"]
+        change = (now - before) / before
+        # A positive "worse" is a slowdown whichever way the unit points
+        worse = -change if result["higher_is_better"] else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<36} {before:>12.4g} {now:>12.4g} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=None, help="write results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="compare against an earlier results file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (0.10 = 10%%)")
+    parser.add_argument("--only", choices=sorted(BENCHMARKS), action="append", help="run just these groups")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=1, help="multiply the iteration counts")
+    args = parser.parse_args()
+
+    measured = {}
+    for group in args.only or BENCHMARKS:
+        start = time.perf_counter()
+        BENCHMARKS[group](measured, args.scale, args.repeat)
+        print(f"{group} benchmarks took {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    results = {name: {"value": value, "unit": unit, "higher_is_better": higher}
+               for name, (value, unit, higher) in measured.items()}
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    else:
+        for name, result in results.items():
+            print(f"{name:<36} {result['value']:>12.4g} {result['unit']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Many processes sharing one scoreboard file: no score may be lost.
+
+Starts --writers processes that each add --rate distinct scores a second
+to the same board for --seconds, calling flush() after every add the way
+the game does every frame, so most flushes are put off and the scores go
+out in batches. The board is made big enough to hold every score. At the
+end the file must hold every one of them. With --kill, that many more
+writers are killed with SIGKILL at random moments; the file must still be
+valid and hold every score the others submitted.
+
+    python benchmarks/stress_scoreboard.py [--writers 50] [--rate 20] [--seconds 5] [--kill 5]
+    python benchmarks/stress_scoreboard.py --flush-interval 0   # a locked write per score
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoreboard import FLUSH_INTERVAL, Scoreboard, load_scoreboard
+
+
+def writer(path, name, scores, interval, size, flush_interval, start, results):
+    """Add the given scores one every interval seconds; report how many writes it took"""
+    board = Scoreboard(path, size=size, flush_interval=flush_interval)
+    writes = 0
+    start.wait()
+    next_add = time.monotonic()
+    for score in scores:
+        if board.add(name, score) == -1:
+            raise RuntimeError(f"{name}: score {score} didn't make a board of {size}")
+        if board.flush():
+            writes += 1
+        next_add += interval
+        time.sleep(max(0.0, next_add - time.monotonic()))
+    if board.pending:
+        board.flush(wait=True)
+        writes += 1
+    results.put((name, writes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=20, help="scores each writer adds per second")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--kill", type=int, default=5, help="extra writers to kill part way through")
+    parser.add_argument("--flush-interval", type=float, default=None,
+                        help="seconds between one writer's writes (default: the scoreboard's)")
+    args = parser.parse_args()
+
+    per_writer = int(args.rate * args.seconds)
+    everyone = args.writers + args.kill
+    size = everyone * per_writer
+    flush_interval = FLUSH_INTERVAL if args.flush_interval is None else args.flush_interval
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "scoreboard.json")
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = []
+        expected = set()
+        for i in range(everyone):
+            name = f"writer{i}" if i < args.writers else f"doomed{i}"
+            scores = [i * per_writer + j + 1 for j in range(per_writer)]  # Distinct across writers
+            rng.shuffle(scores)
+            if i < args.writers:
+                expected.update((name, score) for score in scores)
+            process = multiprocessing.Process(
+                target=writer, args=(path, name, scores, 1 / args.rate, size, flush_interval, start, results))
+            process.start()
+            processes.append(process)
+
+        time.sleep(0.5)  # Let them all open the board
+        began = time.perf_counter()
+        start.set()
+        doomed = processes[args.writers:]
+        for when, process in sorted((rng.uniform(0, args.seconds), process) for process in doomed):
+            time.sleep(max(0.0, began + when - time.perf_counter()))
+            os.kill(process.pid, signal.SIGKILL)
+        writes = dict(results.get() for _ in range(args.writers))
+        elapsed = time.perf_counter() - began
+        for process in processes:
+            process.join()
+
+        entries = load_scoreboard(path)["high_scores"]  # Raises if the file was damaged
+        found = {(entry["name"], entry["score"]) for entry in entries}
+        lost = expected - found
+        leftovers = [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+    submitted = args.writers * per_writer
+    print(f"{everyone} writers ({args.kill} killed) for {elapsed:.1f}s: {submitted} scores checked, "
+          f"{submitted / elapsed:,.0f}/s submitted by the survivors")
+    print(f"{sum(writes.values())} writes, {submitted / max(1, sum(writes.values())):.1f} scores per write "
+          f"(flush interval {flush_interval:g}s)")
+    print(f"{len(entries)} entries on the board, {len(lost)} scores lost, "
+          f"{len(leftovers)} temporary files left behind by killed writers")
+    return 1 if lost else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
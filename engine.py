@@ -0,0 +1,604 @@
+"""Headless Snake rules.
+
+Everything needed to play a game without pygame: the snake, the food, the
+special rewards and the per-tick rules that tie them together. The pygame
+front end in snake_game.py draws this state; bots and tools can drive a
+Game directly, as fast as the CPU allows.
+"""
+import functools
+import random
+import time
+from array import array
+from collections import deque
+from itertools import accumulate, islice
+from operator import sub
+
+# Default board: an 800x600 window split into 30px cells
+GRID_WIDTH = 800 // 30
+GRID_HEIGHT = 600 // 30
+FPS = 8  # Starting speed (ticks per second)
+
+# Direction constants
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+# For PackedBody: direction indices, and each byte of them split into its four
+LINK_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+STEP_X = tuple(dx for dx, dy in DIRECTIONS)
+STEP_Y = tuple(dy for dx, dy in DIRECTIONS)
+UNPACKED = tuple(bytes(byte >> shift & 3 for shift in (0, 2, 4, 6)) for byte in range(256))
+
+# Tuning
+REWARD_CHANCE = 0.0005  # 0.05% chance per tick to spawn a reward
+REWARD_DURATION = 150  # How long a reward stays on the board (in ticks)
+REWARD_POINTS = (50, 100, 200)  # Points for the gold, purple and cyan rewards
+FOOD_POINTS = 10
+SPEED_UP_EVERY = 50  # Speed goes up by one every time the score hits a multiple of this
+TURN_QUEUE_SIZE = 3  # Turns that can wait for a tick; more key presses than this are dropped
+LATENCY_SAMPLES = 1000  # Input latencies kept by TurnQueue
+PACKED_CAPACITY = 64  # Links a PackedBody has room for before it first grows (a power of two)
+PACKED_CHUNK = 1 << 16  # Links decoded at a time while iterating over a PackedBody
+
+
+@functools.lru_cache(maxsize=1)
+def _identity(size):
+    """array('i') of 0..size-1, built once per board size and then copied (a memcpy)
+
+    4-byte items are plenty, as boards are capped at 4M cells; only the last
+    board size is kept, since a process rarely plays more than one.
+    """
+    return array('i', range(size))
+
+
+class FreeCells:
+    """The board cells not covered by the snake
+
+    Free cell indices are packed at the front of an array and every cell
+    remembers its slot in it, so taking a cell, freeing one and picking a
+    uniformly random free cell are all O(1) whatever the fill level.
+    """
+    def __init__(self, size):
+        identity = _identity(size)
+        self.cells = identity[:]
+        self.slots = identity[:]
+        self.count = size
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, index):
+        return self.slots[index] < self.count
+
+    def remove(self, index):
+        """Mark a free cell as taken"""
+        cells = self.cells
+        slots = self.slots
+        slot = slots[index]
+        last = self.count - 1
+        # Swap the cell with the last free one and shrink the free region
+        moved = cells[last]
+        cells[slot] = moved
+        slots[moved] = slot
+        cells[last] = index
+        slots[index] = last
+        self.count = last
+
+    def add(self, index):
+        """Mark a taken cell as free again"""
+        cells = self.cells
+        slots = self.slots
+        slot = slots[index]
+        first = self.count
+        # Swap the cell with the first taken one and grow the free region
+        moved = cells[first]
+        cells[slot] = moved
+        slots[moved] = slot
+        cells[first] = index
+        slots[index] = first
+        self.count = first + 1
+
+    def choice(self, rng):
+        """Return a random free cell index, or None if the board is full"""
+        if not self.count:
+            return None
+        return self.cells[rng.randrange(self.count)]
+
+
+class PackedBody:
+    """A snake's body as its end cells plus two bits per segment
+
+    A drop-in for the deque of (x, y) tuples in Snake.positions, head first,
+    for snakes of millions of segments: each link between two segments is
+    stored as the direction (an index into DIRECTIONS) from the one behind
+    to the one ahead, four to a byte. The links sit in a ring buffer, so
+    appendleft() of a new head and pop() of the tail are O(1); the buffer
+    doubles when it fills up. Iterating decodes the links a chunk at a time
+    and adds them up from one end. Indexing walks too, so [0], [1] and [-1]
+    are O(1) but the middle is O(n).
+    """
+    def __init__(self, positions=()):
+        self.codes = bytearray(PACKED_CAPACITY // 4)
+        self.mask = PACKED_CAPACITY - 1  # Link slots minus one (a power of two)
+        self.start = 0  # Slot of the tail's link; the rest follow it towards the head
+        self.links = 0
+        self.head = None
+        self.tail = None
+        # Cells come head first, so the body is built from the head back
+        for cell in positions:
+            self.append(cell)
+
+    def __len__(self):
+        return 0 if self.head is None else self.links + 1
+
+    def _unpacked(self, first, count):
+        """count links from slot first on, one byte each"""
+        codes = self.codes
+        low = first >> 2
+        high = (first + count + 3) >> 2
+        data = codes[low:high] if high <= len(codes) else codes[low:] + codes[:high - len(codes)]
+        offset = first & 3
+        return b"".join(map(UNPACKED.__getitem__, data))[offset:offset + count]
+
+    def __iter__(self):
+        if self.head is None:
+            return
+        x, y = self.head
+        yield x, y
+        remaining = self.links
+        end = self.start + remaining
+        while remaining:
+            count = min(remaining, PACKED_CHUNK)
+            remaining -= count
+            end -= count
+            links = self._unpacked(end & self.mask, count)[::-1]
+            yield from zip(islice(accumulate(map(STEP_X.__getitem__, links), sub, initial=x), 1, None),
+                           islice(accumulate(map(STEP_Y.__getitem__, links), sub, initial=y), 1, None))
+            x -= sum(map(STEP_X.__getitem__, links))
+            y -= sum(map(STEP_Y.__getitem__, links))
+
+    def __reversed__(self):
+        if self.head is None:
+            return
+        x, y = self.tail
+        yield x, y
+        first = self.start
+        remaining = self.links
+        while remaining:
+            count = min(remaining, PACKED_CHUNK)
+            links = self._unpacked(first & self.mask, count)
+            yield from zip(islice(accumulate(map(STEP_X.__getitem__, links), initial=x), 1, None),
+                           islice(accumulate(map(STEP_Y.__getitem__, links), initial=y), 1, None))
+            x += sum(map(STEP_X.__getitem__, links))
+            y += sum(map(STEP_Y.__getitem__, links))
+            first += count
+            remaining -= count
+
+    def __getitem__(self, i):
+        # The ends are stored, and the head is asked for every tick
+        if i == 0 and self.head is not None:
+            return self.head
+        if i == -1 and self.tail is not None:
+            return self.tail
+        if i == 1 and self.links:
+            # The head less the newest link, which renderers ask for every tick
+            slot = (self.start + self.links - 1) & self.mask
+            dx, dy = DIRECTIONS[self.codes[slot >> 2] >> ((slot & 3) << 1) & 3]
+            return self.head[0] - dx, self.head[1] - dy
+        size = len(self)
+        if i < 0:
+            i += size
+        if not 0 <= i < size:
+            raise IndexError("body index out of range")
+        if i < size // 2:
+            return next(islice(iter(self), i, None))
+        return next(islice(reversed(self), size - 1 - i, None))
+
+    def _grow(self):
+        """Double the ring buffer, unrolling it so the tail's link is in slot 0"""
+        codes = self.codes
+        value = int.from_bytes(codes, "little")
+        bits = len(codes) * 8
+        split = self.start * 2
+        value = (value >> split) | ((value & ((1 << split) - 1)) << (bits - split))
+        self.codes = bytearray(value.to_bytes(len(codes) * 2, "little"))
+        self.mask = self.mask * 2 + 1
+        self.start = 0
+
+    def _add_link(self, slot, behind, ahead):
+        code = LINK_CODES.get((ahead[0] - behind[0], ahead[1] - behind[1]))
+        if code is None:
+            raise ValueError(f"{behind} and {ahead} are not next to each other")
+        codes = self.codes
+        shift = (slot & 3) << 1
+        codes[slot >> 2] = codes[slot >> 2] & ~(3 << shift) | code << shift
+        self.links += 1
+
+    def appendleft(self, cell):
+        """Add a new head next to the current one"""
+        head = self.head
+        if head is None:
+            self.head = self.tail = cell
+            return
+        # Snake.update calls this every tick, so _add_link is inlined here
+        code = LINK_CODES.get((cell[0] - head[0], cell[1] - head[1]))
+        if code is None:
+            raise ValueError(f"{head} and {cell} are not next to each other")
+        links = self.links
+        if links > self.mask:
+            self._grow()
+        slot = (self.start + links) & self.mask
+        codes = self.codes
+        shift = (slot & 3) << 1
+        codes[slot >> 2] = codes[slot >> 2] & ~(3 << shift) | code << shift
+        self.links = links + 1
+        self.head = cell
+
+    def append(self, cell):
+        """Add a new tail behind the current one"""
+        if self.head is not None:
+            if self.links > self.mask:
+                self._grow()
+            start = (self.start - 1) & self.mask
+            self._add_link(start, cell, self.tail)
+            self.start = start
+        else:
+            self.head = cell
+        self.tail = cell
+
+    def pop(self):
+        """Remove the tail and return its cell"""
+        tail = self.tail
+        if tail is None:
+            raise IndexError("pop from an empty body")
+        links = self.links
+        if links:
+            slot = self.start
+            dx, dy = DIRECTIONS[self.codes[slot >> 2] >> ((slot & 3) << 1) & 3]
+            self.tail = (tail[0] + dx, tail[1] + dy)
+            self.start = (slot + 1) & self.mask
+            self.links = links - 1
+        else:
+            self.head = self.tail = None
+        return tail
+
+
+class Snake:
+    """The snake's body and movement
+
+    The body is a deque (head first) mirrored by an occupancy bytearray with
+    one byte per board cell, so moving, growing and self-collision checks
+    all take constant time however long the snake gets. The cells it does
+    not cover are kept in a FreeCells index for spawning food and rewards.
+    With packed=True the body is a PackedBody instead, which takes a
+    quarter of a byte per segment rather than a tuple.
+    """
+    def __init__(self, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, packed=False):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.body_class = PackedBody if packed else deque
+        self.reset()
+
+    def reset(self):
+        # A fresh board, so the free-cell order (and with it every spawn)
+        # depends only on the game's seed, not on earlier games
+        self.occupied = bytearray(self.grid_width * self.grid_height)
+        self.free = FreeCells(self.grid_width * self.grid_height)
+        self.positions = self.body_class()
+
+        # Start with 3 segments in the middle of the board
+        self.set_positions([
+            (self.grid_width // 2, self.grid_height // 2),
+            (self.grid_width // 2 - 1, self.grid_height // 2),
+            (self.grid_width // 2 - 2, self.grid_height // 2)
+        ])
+        self.direction = RIGHT
+        self.score = 0
+        self.speed = FPS
+        self.collision = None  # "wall" or "self" once the snake has died
+
+    def set_positions(self, positions):
+        """Replace the body with the given cells (head first)"""
+        occupied = self.occupied
+        free = self.free
+        for x, y in self.positions:
+            occupied[y * self.grid_width + x] = 0
+            free.add(y * self.grid_width + x)
+        self.positions = self.body_class(positions)
+        self.last_tail = None  # Cell the tail left on the last move, if any
+        for x, y in self.positions:
+            occupied[y * self.grid_width + x] = 1
+            free.remove(y * self.grid_width + x)
+        self.length = len(self.positions)
+
+    def get_head_position(self):
+        return self.positions[0]
+
+    def is_occupied(self, position):
+        return self.occupied[position[1] * self.grid_width + position[0]] == 1
+
+    def cells_in(self, x0, y0, x1, y1):
+        """Yield the body cells with x0 <= x < x1 and y0 <= y < y1
+
+        Scans the occupancy grid row by row, so the cost follows the area
+        asked about, not the length of the snake.
+        """
+        occupied = self.occupied
+        width = self.grid_width
+        x0 = max(x0, 0)
+        x1 = min(x1, width)
+        for y in range(max(y0, 0), min(y1, self.grid_height)):
+            row = y * width
+            index = occupied.find(1, row + x0, row + x1)
+            while index != -1:
+                yield index - row, y
+                index = occupied.find(1, index + 1, row + x1)
+
+    def update(self):
+        """Move one cell forward; return False if the snake crashed"""
+        current = self.positions[0]
+        x, y = self.direction
+
+        # Calculate new head position
+        new_x = current[0] + x
+        new_y = current[1] + y
+
+        # Check for wall collision
+        if (new_x < 0 or new_x >= self.grid_width or
+                new_y < 0 or new_y >= self.grid_height):
+            self.collision = "wall"
+            return False
+
+        # Check for self collision (the tail cell counts, as it hasn't moved yet)
+        index = new_y * self.grid_width + new_x
+        if self.occupied[index]:
+            self.collision = "self"
+            return False
+
+        # Move snake
+        positions = self.positions
+        positions.appendleft((new_x, new_y))
+        self.occupied[index] = 1
+        self.free.remove(index)
+        if len(positions) > self.length:
+            self.last_tail = tail_x, tail_y = positions.pop()
+            tail = tail_y * self.grid_width + tail_x
+            self.occupied[tail] = 0
+            self.free.add(tail)
+        else:
+            self.last_tail = None
+
+        return True
+
+    def change_direction(self, direction):
+        # Prevent reversing direction
+        if (direction[0] * -1, direction[1] * -1) == self.direction:
+            return
+        self.direction = direction
+
+
+class TurnQueue:
+    """Turns pressed but not yet made, one per tick
+
+    A turn is checked against the last turn still waiting (or the snake's
+    direction if none is), so RIGHT then UP then LEFT inside one tick
+    becomes two turns over two ticks instead of a reversal into the neck.
+    Repeats and reversals are dropped, as is anything past size waiting
+    turns.
+
+    Every turn made records its latency, from push() to the tick that
+    applied it, in ticks (1 = the very next tick) and in seconds.
+    """
+    def __init__(self, size=TURN_QUEUE_SIZE, clock=time.monotonic):
+        self.size = size
+        self.clock = clock
+        self.pending = deque()  # (direction, tick pushed, time pushed)
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # (ticks, seconds)
+
+    def __len__(self):
+        return len(self.pending)
+
+    def clear(self):
+        self.pending.clear()
+
+    def push(self, direction, heading, tick):
+        """Queue a turn for a snake heading that way at that tick; return whether it was kept"""
+        if self.pending:
+            heading = self.pending[-1][0]
+        if (direction == heading or (-direction[0], -direction[1]) == heading
+                or len(self.pending) >= self.size):
+            return False
+        self.pending.append((direction, tick, self.clock()))
+        return True
+
+    def pop(self, tick):
+        """The turn to make on the tick after tick, or None"""
+        if not self.pending:
+            return None
+        direction, pushed_tick, pushed_time = self.pending.popleft()
+        self.latencies.append((tick + 1 - pushed_tick, self.clock() - pushed_time))
+        return direction
+
+    def latency_summary(self):
+        """Median, 95th percentile and worst latency as (ticks, milliseconds) pairs"""
+        if not self.latencies:
+            return None
+        ticks = sorted(sample[0] for sample in self.latencies)
+        millis = sorted(sample[1] * 1000 for sample in self.latencies)
+        summary = {"samples": len(ticks)}
+        for name, fraction in (("p50", 0.5), ("p95", 0.95), ("max", 1.0)):
+            i = min(len(ticks) - 1, int(fraction * len(ticks)))
+            summary[name] = (ticks[i], millis[i])
+        return summary
+
+
+class Food:
+    def __init__(self, rng, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT):
+        self.rng = rng
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.position = (0, 0)
+
+    def randomize_position(self, free_cells):
+        """Move the food to a random cell that is not on the snake
+
+        Returns False if there is no free cell left.
+        """
+        index = free_cells.choice(self.rng)
+        if index is None:
+            return False
+        self.position = (index % self.grid_width, index // self.grid_width)
+        return True
+
+
+class Reward:
+    def __init__(self, rng, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT):
+        self.rng = rng
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.position = (0, 0)
+        self.active = False
+        self.timer = 0
+        self.duration = REWARD_DURATION
+        self.point_values = REWARD_POINTS  # Points of each type
+        self.points = 0
+        self.type = 0
+
+    def activate(self, free_cells):
+        """Activate a new random reward"""
+        if not free_cells:
+            return
+        self.active = True
+        self.timer = self.duration
+
+        # Randomize reward type (0: gold, 1: purple, 2: cyan)
+        self.type = self.rng.randint(0, len(self.point_values) - 1)
+        self.points = self.point_values[self.type]
+
+        # Randomize position (not on snake)
+        self.randomize_position(free_cells)
+
+    def randomize_position(self, free_cells):
+        """Randomize the reward position (not on snake)"""
+        index = free_cells.choice(self.rng)
+        self.position = (index % self.grid_width, index // self.grid_width)
+
+    def update(self):
+        """Update reward timer"""
+        if self.active:
+            self.timer -= 1
+            if self.timer <= 0:
+                self.active = False
+
+
+class Game:
+    """One game of Snake, advanced a tick at a time with step()
+
+    Subclasses can swap in their own Snake/Food/Reward classes (the pygame
+    front end adds render methods this way) without touching the rules.
+    packed=True keeps the snake's body bit-packed (see PackedBody).
+    """
+    snake_class = Snake
+    food_class = Food
+    reward_class = Reward
+
+    def __init__(self, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, seed=None, packed=False):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.rng = random.Random()
+        self.reward_chance = REWARD_CHANCE
+        self.speed_up_every = SPEED_UP_EVERY
+        self.snake = self.snake_class(grid_width, grid_height, packed)
+        self.food = self.food_class(self.rng, grid_width, grid_height)
+        self.reward = self.reward_class(self.rng, grid_width, grid_height)
+        self.turns = TurnQueue()
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Start a new game
+
+        Every game is seeded, so that its seed plus the moves made replay it
+        exactly. Without a seed, the next one is drawn from the current
+        random generator.
+        """
+        if seed is None:
+            seed = self.rng.getrandbits(64)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.snake.reset()
+        self.food.randomize_position(self.snake.free)
+        self.reward.active = False
+        self.turns.clear()
+        self.game_over = False
+        self.won = False  # Set when the snake fills the whole board
+        self.death_cause = None
+        self.ticks = 0
+        # What happened during the last tick
+        self.ate_food = False
+        self.reward_collected = 0
+
+    def queue_turn(self, direction):
+        """Turn on a later tick, after any turns already waiting; return whether it was kept"""
+        return self.turns.push(direction, self.snake.direction, self.ticks)
+
+    def step(self, direction=None):
+        """Advance the game by one tick; return False once the game is over
+
+        Without a direction, the next turn waiting in self.turns is made.
+        """
+        if self.game_over:
+            return False
+        if direction is None:
+            direction = self.turns.pop(self.ticks)
+
+        snake = self.snake
+        food = self.food
+        reward = self.reward
+        self.ate_food = False
+        self.reward_collected = 0
+
+        if direction is not None:
+            snake.change_direction(direction)
+
+        self.ticks += 1
+        if not snake.update():
+            self.game_over = True
+            self.death_cause = snake.collision
+            return False
+
+        head = snake.get_head_position()
+
+        # Check if snake ate food
+        if head == food.position:
+            snake.length += 1
+            snake.score += FOOD_POINTS
+            self.ate_food = True
+
+            # Increase speed every 50 points
+            if snake.score % self.speed_up_every == 0:
+                snake.speed += 1
+
+            # Nowhere left to put the food: the snake has filled the board
+            if not food.randomize_position(snake.free):
+                self.game_over = True
+                self.won = True
+                return False
+
+        # Check if snake ate a reward
+        if reward.active and head == reward.position:
+            snake.score += reward.points
+            self.reward_collected = reward.points
+            reward.active = False
+
+            # Bonus: Add a segment to the snake when collecting a reward
+            snake.length += 1
+
+        reward.update()
+
+        # Random chance to spawn a reward if none is active
+        if not reward.active and self.rng.random() < self.reward_chance:
+            reward.activate(snake.free)
+
+        return True
@@ -0,0 +1,250 @@
+"""Every score ever submitted, in a local SQLite database.
+
+The high score board only remembers the top 10. The leaderboard keeps all
+scores and answers rank queries over them:
+
+- submit a score, or bulk-import many
+- the rank of any score (1 + how many scores beat it, so ties share a rank)
+- the top K entries
+- a page of entries around a given entry
+
+Entries are ordered by score, best first, then by submission order. The
+(score, id) index makes top-K and paging a range scan of just the rows
+returned. Ranks come from the per-score counts, kept in memory (built from
+the score_counts table on open) as a sorted list cut into blocks of at
+most 2 * BLOCK_SIZE distinct scores, with a Fenwick tree over the block
+totals. A rank or a new score costs O(log D) for D distinct scores plus
+work within one block, however many rows there are; a full block splits
+in two, which rebuilds only the small tree over the blocks. Several
+processes can share one database: each checks PRAGMA data_version before
+answering, and rebuilds its index when another one has written since.
+
+    python leaderboard.py import scores.csv    # name,score per line
+    python leaderboard.py top 10
+    python leaderboard.py rank 1200
+    python leaderboard.py around 123456 5
+"""
+import argparse
+import bisect
+import csv
+import sqlite3
+import sys
+from collections import Counter
+
+LEADERBOARD_FILE = "leaderboard.db"
+BLOCK_SIZE = 1000  # Distinct scores per block of the rank index; a block splits at twice this
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_rank ON scores (score DESC, id);
+CREATE TABLE IF NOT EXISTS score_counts (
+    score INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class Leaderboard:
+    def __init__(self, path=LEADERBOARD_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        # Write-ahead logging: submissions don't block readers and commit faster
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._data_version = None
+        self._refresh()
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        self._refresh()
+        return self._total
+
+    def _refresh(self):
+        """Rebuild the rank index if another connection has written to the database"""
+        # data_version changes on other connections' commits, not on this one's
+        version = self.db.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._build(self.db.execute("SELECT score, count FROM score_counts ORDER BY score").fetchall())
+
+    def _build(self, counts):
+        """Rebuild the rank index from (score, count) pairs sorted by score"""
+        self._blocks = [[score for score, _ in counts[i:i + BLOCK_SIZE]]
+                        for i in range(0, len(counts), BLOCK_SIZE)]
+        self._block_counts = [[count for _, count in counts[i:i + BLOCK_SIZE]]
+                              for i in range(0, len(counts), BLOCK_SIZE)]
+        self._total = sum(count for _, count in counts)
+        self._build_tree()
+
+    def _build_tree(self):
+        """Rebuild the block maxima and the Fenwick tree over the block totals"""
+        self._maxes = [block[-1] for block in self._blocks]
+        tree = [0] + [sum(counts) for counts in self._block_counts]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _count_add(self, score, count):
+        blocks = self._blocks
+        if not blocks:
+            self._blocks = [[score]]
+            self._block_counts = [[count]]
+            self._total = count
+            self._build_tree()
+            return
+        b = min(bisect.bisect_left(self._maxes, score), len(blocks) - 1)
+        block = blocks[b]
+        counts = self._block_counts[b]
+        position = bisect.bisect_left(block, score)
+        self._total += count
+        if position < len(block) and block[position] == score:
+            counts[position] += count
+        else:
+            # A score we've never seen: a list insert into one block
+            block.insert(position, score)
+            counts.insert(position, count)
+            if len(block) > 2 * BLOCK_SIZE:
+                blocks[b:b + 1] = [block[:BLOCK_SIZE], block[BLOCK_SIZE:]]
+                self._block_counts[b:b + 1] = [counts[:BLOCK_SIZE], counts[BLOCK_SIZE:]]
+                self._build_tree()
+                return
+            self._maxes[b] = block[-1]
+        i = b + 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += count
+            i += i & -i
+
+    def _count_at_most(self, score):
+        """How many entries scored score or less"""
+        b = bisect.bisect_right(self._maxes, score)
+        total = 0
+        if b < len(self._blocks):
+            total = sum(self._block_counts[b][:bisect.bisect_right(self._blocks[b], score)])
+        i = b
+        tree = self._tree
+        while i:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def rank(self, score):
+        """1-based rank a score has (or would have) on the leaderboard"""
+        self._refresh()
+        return self._rank(score)
+
+    def _rank(self, score):
+        return self._total - self._count_at_most(score) + 1
+
+    def submit(self, name, score):
+        """Record a score; return its entry id"""
+        self._refresh()  # Later commits by others bump data_version again, so no race here
+        with self.db:
+            entry_id = self.db.execute(
+                "INSERT INTO scores (name, score) VALUES (?, ?)", (name, score)).lastrowid
+            self.db.execute(
+                "INSERT INTO score_counts (score, count) VALUES (?, 1) "
+                "ON CONFLICT (score) DO UPDATE SET count = count + 1", (score,))
+        self._count_add(score, 1)
+        return entry_id
+
+    def import_scores(self, entries):
+        """Add many (name, score) pairs in one transaction; return how many"""
+        counts = Counter()
+
+        def rows():
+            for name, score in entries:
+                score = int(score)
+                counts[score] += 1
+                yield name, score
+
+        with self.db:
+            self.db.executemany("INSERT INTO scores (name, score) VALUES (?, ?)", rows())
+            self.db.executemany(
+                "INSERT INTO score_counts (score, count) VALUES (?, ?) "
+                "ON CONFLICT (score) DO UPDATE SET count = count + excluded.count",
+                counts.items())
+        self._build(self.db.execute("SELECT score, count FROM score_counts ORDER BY score").fetchall())
+        return sum(counts.values())
+
+    def _entries(self, rows):
+        rows = list(rows)
+        self._refresh()
+        return [{"id": entry_id, "name": name, "score": score, "rank": self._rank(score)}
+                for entry_id, name, score in rows]
+
+    def top(self, k=10):
+        """The best k entries"""
+        rows = self.db.execute(
+            "SELECT id, name, score FROM scores ORDER BY score DESC, id LIMIT ?", (k,))
+        return self._entries(rows)
+
+    def entry(self, entry_id):
+        row = self.db.execute("SELECT id, name, score FROM scores WHERE id = ?", (entry_id,)).fetchone()
+        return self._entries([row])[0] if row else None
+
+    def around(self, entry_id, k=5):
+        """Up to k entries either side of an entry, in leaderboard order"""
+        row = self.db.execute("SELECT score FROM scores WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return []
+        score = row[0]
+        # Ties with the entry first, then the other scores; each query is one index range
+        above = self.db.execute(
+            "SELECT id, name, score FROM scores WHERE score = ? AND id < ? "
+            "ORDER BY id DESC LIMIT ?", (score, entry_id, k)).fetchall()
+        above += self.db.execute(
+            "SELECT id, name, score FROM scores WHERE score > ? "
+            "ORDER BY score, id DESC LIMIT ?", (score, k - len(above))).fetchall()
+        rest = self.db.execute(
+            "SELECT id, name, score FROM scores WHERE score = ? AND id >= ? "
+            "ORDER BY id LIMIT ?", (score, entry_id, k + 1)).fetchall()
+        rest += self.db.execute(
+            "SELECT id, name, score FROM scores WHERE score < ? "
+            "ORDER BY score DESC, id LIMIT ?", (score, k + 1 - len(rest))).fetchall()
+        return self._entries(above[::-1] + rest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or fill the leaderboard")
+    parser.add_argument("--db", default=LEADERBOARD_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_command = commands.add_parser("import", help="bulk import name,score rows from a CSV file")
+    import_command.add_argument("csv_file")
+    top_command = commands.add_parser("top", help="show the best entries")
+    top_command.add_argument("k", type=int, nargs="?", default=10)
+    rank_command = commands.add_parser("rank", help="show the rank of a score")
+    rank_command.add_argument("score", type=int)
+    around_command = commands.add_parser("around", help="show the entries around an entry id")
+    around_command.add_argument("entry_id", type=int)
+    around_command.add_argument("k", type=int, nargs="?", default=5)
+    args = parser.parse_args()
+
+    leaderboard = Leaderboard(args.db)
+    if args.command == "import":
+        with open(args.csv_file, newline="") as f:
+            count = leaderboard.import_scores((row[0], row[1]) for row in csv.reader(f) if row)
+        print(f"Imported {count} scores ({len(leaderboard)} total)")
+    elif args.command == "rank":
+        print(f"Score {args.score} ranks #{leaderboard.rank(args.score)} of {len(leaderboard)}")
+    else:
+        if args.command == "top":
+            entries = leaderboard.top(args.k)
+        else:
+            entries = leaderboard.around(args.entry_id, args.k)
+        for entry in entries:
+            print(f"#{entry['rank']:<8} {entry['name']:<12} {entry['score']:>8}  (id {entry['id']})")
+    leaderboard.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Game states for lookahead search, cheap to clone.
+
+Planners (MCTS, beam search) clone the state they are searching from
+thousands of times per decision. GameState holds everything a game needs in
+a handful of immutable values, so clone() is a copy of a few references and
+a clone and its original never share anything that either of them mutates:
+
+- the body is one int of 2-bit direction codes, one per link from a segment
+  to the one ahead of it, newest (next to the head) in the lowest bits,
+  plus the head and tail cells;
+- the occupied cells are one int with a bit per board cell;
+- the spawn random generator is a 64-bit int, stepped in the state itself.
+
+step() builds new ints instead of changing them, which is the copy on
+write: its cost grows with the board area (a bit per cell, about 70 bytes
+on the default board) rather than with the number of clones.
+
+The rules are the ones in engine.Game.step, but spawns come from the
+state's own generator rather than the game's random.Random, so a state
+follows its game exactly only until food or a reward is placed. That is
+what lookahead wants anyway: a player can't know where the next food goes.
+
+    from lookahead import GameState
+
+    root = GameState.from_game(game)
+    for direction in engine.DIRECTIONS:
+        child = root.clone()
+        child.step(direction)
+"""
+import itertools
+
+import engine
+
+CODES = {direction: code for code, direction in enumerate(engine.DIRECTIONS)}
+DIGITS = {direction: ord(str(code)) for direction, code in CODES.items()}
+BINARY_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+GUESSES = 8  # Random cells tried for a spawn before picking among the free ones directly
+
+# A 64-bit linear congruential generator (Knuth's MMIX constants)
+MULTIPLIER = 6364136223846793005
+INCREMENT = 1442695040888963407
+MASK = (1 << 64) - 1
+
+
+class GameState:
+    """One game's state as immutable values, with clone() and step()
+
+    Positions are (x, y) tuples as in engine.Game; the reward is None or
+    (x, y, points, timer).
+    """
+    __slots__ = ("width", "height", "reward_chance", "reward_duration", "point_values", "speed_up_every",
+                 "head", "tail", "links", "size", "length", "occupied", "direction", "food", "reward",
+                 "score", "speed", "ticks", "seed", "game_over", "won", "death_cause", "ate_food",
+                 "reward_collected")
+
+    @classmethod
+    def from_game(cls, game, seed=None):
+        """Capture an engine.Game; seed starts the spawn generator (default: the game's seed and tick)"""
+        snake = game.snake
+        positions = snake.positions
+        state = cls.__new__(cls)
+        state.width = game.grid_width
+        state.height = game.grid_height
+        state.reward_chance = game.reward_chance
+        state.reward_duration = game.reward.duration
+        state.point_values = game.reward.point_values
+        state.speed_up_every = game.speed_up_every
+        state.head = positions[0]
+        state.tail = positions[-1]
+        # One walk over the body (indexing a PackedBody is O(n)), as base-4
+        # digits with the newest link last, which int() reads in linear time
+        digits = bytes(DIGITS[(ahead[0] - behind[0], ahead[1] - behind[1])]
+                       for ahead, behind in itertools.pairwise(positions))
+        state.links = int(digits[::-1], 4) if digits else 0
+        state.size = len(positions)
+        state.length = snake.length
+        # The snake's occupancy bytes, one per cell, as binary digits
+        state.occupied = int(snake.occupied.translate(BINARY_DIGITS)[::-1], 2)
+        state.direction = snake.direction
+        state.food = game.food.position
+        reward = game.reward
+        state.reward = (*reward.position, reward.points, reward.timer) if reward.active else None
+        state.score = snake.score
+        state.speed = snake.speed
+        state.ticks = game.ticks
+        state.seed = (hash((game.seed, game.ticks)) if seed is None else seed) & MASK
+        state.game_over = game.game_over
+        state.won = game.won
+        state.death_cause = game.death_cause
+        state.ate_food = game.ate_food
+        state.reward_collected = game.reward_collected
+        return state
+
+    def clone(self):
+        state = GameState.__new__(GameState)
+        state.width = self.width
+        state.height = self.height
+        state.reward_chance = self.reward_chance
+        state.reward_duration = self.reward_duration
+        state.point_values = self.point_values
+        state.speed_up_every = self.speed_up_every
+        state.head = self.head
+        state.tail = self.tail
+        state.links = self.links
+        state.size = self.size
+        state.length = self.length
+        state.occupied = self.occupied
+        state.direction = self.direction
+        state.food = self.food
+        state.reward = self.reward
+        state.score = self.score
+        state.speed = self.speed
+        state.ticks = self.ticks
+        state.seed = self.seed
+        state.game_over = self.game_over
+        state.won = self.won
+        state.death_cause = self.death_cause
+        state.ate_food = self.ate_food
+        state.reward_collected = self.reward_collected
+        return state
+
+    def positions(self):
+        """Yield the body cells, head first"""
+        x, y = self.head
+        yield x, y
+        links = self.links
+        for _ in range(self.size - 1):
+            dx, dy = engine.DIRECTIONS[links & 3]
+            links >>= 2
+            x -= dx
+            y -= dy
+            yield x, y
+
+    def is_occupied(self, position):
+        return self.occupied >> (position[1] * self.width + position[0]) & 1 == 1
+
+    def _random(self, n):
+        """A random int in [0, n), from the state's own generator"""
+        self.seed = seed = (self.seed * MULTIPLIER + INCREMENT) & MASK
+        return ((seed >> 32) * n) >> 32
+
+    def _random_free_cell(self):
+        """A uniformly random cell not on the snake, or None if the board is full"""
+        cells = self.width * self.height
+        occupied = self.occupied
+        for _ in range(GUESSES):
+            index = self._random(cells)
+            if not occupied >> index & 1:
+                break
+        else:
+            # A crowded board: count off the free cells instead
+            free = cells - self.size
+            if not free:
+                return None
+            skip = self._random(free)
+            bits = bin(occupied)[:1:-1].ljust(cells, "0")
+            index = -1
+            for _ in range(skip + 1):
+                index = bits.index("0", index + 1)
+        return index % self.width, index // self.width
+
+    def step(self, direction=None):
+        """Advance one tick, turning first if a direction is given; return False once the game is over"""
+        if self.game_over:
+            return False
+        self.ate_food = False
+        self.reward_collected = 0
+        if direction is not None and (-direction[0], -direction[1]) != self.direction:
+            self.direction = direction
+
+        self.ticks += 1
+        dx, dy = self.direction
+        x = self.head[0] + dx
+        y = self.head[1] + dy
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            self.game_over = True
+            self.death_cause = "wall"
+            return False
+        # The tail cell counts, as it hasn't moved yet
+        bit = 1 << (y * self.width + x)
+        occupied = self.occupied
+        if occupied & bit:
+            self.game_over = True
+            self.death_cause = "self"
+            return False
+
+        head = self.head = (x, y)
+        occupied |= bit
+        links = (self.links << 2) | CODES[self.direction]
+        if self.size >= self.length:
+            # The tail follows its link forward
+            shift = 2 * (self.size - 1)
+            tail_x, tail_y = self.tail
+            occupied ^= 1 << (tail_y * self.width + tail_x)
+            tail_dx, tail_dy = engine.DIRECTIONS[links >> shift & 3]
+            self.tail = (tail_x + tail_dx, tail_y + tail_dy)
+            links &= (1 << shift) - 1
+        else:
+            self.size += 1
+        self.links = links
+        self.occupied = occupied
+
+        if head == self.food:
+            self.length += 1
+            self.score += engine.FOOD_POINTS
+            self.ate_food = True
+            if self.score % self.speed_up_every == 0:
+                self.speed += 1
+            food = self._random_free_cell()
+            if food is None:
+                self.game_over = True
+                self.won = True
+                return False
+            self.food = food
+
+        reward = self.reward
+        if reward is not None:
+            reward_x, reward_y, points, timer = reward
+            if head == (reward_x, reward_y):
+                self.score += points
+                self.reward_collected = points
+                self.length += 1
+                self.reward = None
+            elif timer > 1:
+                self.reward = (reward_x, reward_y, points, timer - 1)
+            else:
+                self.reward = None
+
+        if self.reward is None and self._random(1 << 32) < self.reward_chance * (1 << 32):
+            cell = self._random_free_cell()
+            if cell is not None:
+                points = self.point_values[self._random(len(self.point_values))]
+                self.reward = (*cell, points, self.reward_duration)
+
+        return True
@@ -0,0 +1,164 @@
+"""Observations of engine.Game states for training agents.
+
+An observation is a float32 grid of CHANNELS planes, (channel, y, x), plus
+a vector of FEATURES. The encoder owns both buffers and updates them in
+place after every tick. Only the cells that changed are written: the new
+and old head, the cell the tail left, and food or reward spawns. The arrays
+it returns are the buffers themselves, not copies, so they change on
+the next update; copy them if you need to keep one.
+
+    from observation import SnakeEnv
+
+    env = SnakeEnv(seed=0)
+    (grid, features) = env.reset()
+    (grid, features), reward, done, info = env.step(action)
+
+BatchEncoder does the same for many games at once, writing each game into
+its own slice of one (games, channel, y, x) array.
+
+Requires numpy (pip install numpy).
+"""
+import numpy as np
+
+import engine
+from batch_env import NOOP
+
+BODY, HEAD, FOOD, REWARD = range(4)
+CHANNELS = ("body", "head", "food", "reward")  # The reward plane holds the time it has left (1 to 0)
+FEATURES = ("up", "down", "left", "right", "length", "reward_timer", "reward_points",
+            "food_dx", "food_dy")
+MAX_REWARD_POINTS = max(engine.REWARD_POINTS)
+
+
+class ObservationEncoder:
+    """Keeps the observation of one game up to date
+
+    Call update() after each step() (or reset()). If ticks were skipped, or
+    the game was reset or ended, it re-encodes everything instead.
+    grid and features can be views into bigger arrays (see BatchEncoder).
+    """
+    def __init__(self, game, grid=None, features=None):
+        self.game = game
+        shape = (len(CHANNELS), game.grid_height, game.grid_width)
+        self.grid = np.zeros(shape, dtype=np.float32) if grid is None else grid
+        self.features = np.zeros(len(FEATURES), dtype=np.float32) if features is None else features
+        self.cells = game.grid_width * game.grid_height
+        self._key = None  # (seed, ticks) of the state the buffers show
+        self._head = None
+        self._food = None
+        self._reward = None  # Cell the reward plane is set on, if any
+        self.update()
+
+    def update(self):
+        """Bring the buffers up to the game's current tick; return (grid, features)"""
+        game = self.game
+        key = (game.seed, game.ticks)
+        if key != self._key:
+            if self._key is not None and key == (self._key[0], self._key[1] + 1) and not game.game_over:
+                self._tick()
+            else:
+                self._encode()
+            self._key = key
+            self._features()
+        return self.grid, self.features
+
+    def _encode(self):
+        """Everything from scratch"""
+        game = self.game
+        grid = self.grid
+        grid.fill(0.0)
+        body = grid[BODY]
+        for x, y in game.snake.positions:
+            body[y, x] = 1.0
+        head_x, head_y = self._head = game.snake.positions[0]
+        grid[HEAD, head_y, head_x] = 1.0
+        food_x, food_y = self._food = game.food.position
+        grid[FOOD, food_y, food_x] = 1.0
+        self._reward = None
+        self._set_reward()
+
+    def _tick(self):
+        """Just the cells one tick can change"""
+        game = self.game
+        snake = game.snake
+        grid = self.grid
+        x, y = self._head
+        grid[HEAD, y, x] = 0.0
+        x, y = self._head = snake.positions[0]
+        grid[HEAD, y, x] = 1.0
+        grid[BODY, y, x] = 1.0
+        if snake.last_tail is not None:
+            x, y = snake.last_tail
+            grid[BODY, y, x] = 0.0
+        if game.food.position != self._food:
+            x, y = self._food
+            grid[FOOD, y, x] = 0.0
+            x, y = self._food = game.food.position
+            grid[FOOD, y, x] = 1.0
+        if self._reward is not None:
+            x, y = self._reward
+            grid[REWARD, y, x] = 0.0
+            self._reward = None
+        self._set_reward()
+
+    def _set_reward(self):
+        reward = self.game.reward
+        if reward.active:
+            x, y = self._reward = reward.position
+            self.grid[REWARD, y, x] = reward.timer / reward.duration
+
+    def _features(self):
+        game = self.game
+        snake = game.snake
+        reward = game.reward
+        features = self.features
+        features[:4] = 0.0
+        features[engine.DIRECTIONS.index(snake.direction)] = 1.0
+        features[4] = len(snake.positions) / self.cells
+        if reward.active:
+            features[5] = reward.timer / reward.duration
+            features[6] = reward.points / MAX_REWARD_POINTS
+        else:
+            features[5] = features[6] = 0.0
+        head_x, head_y = self._head
+        food_x, food_y = self._food
+        features[7] = (food_x - head_x) / game.grid_width
+        features[8] = (food_y - head_y) / game.grid_height
+
+
+class BatchEncoder:
+    """Observations of many games in two arrays, grids (games, channel, y, x) and features"""
+    def __init__(self, games):
+        first = games[0]
+        self.grids = np.zeros((len(games), len(CHANNELS), first.grid_height, first.grid_width),
+                              dtype=np.float32)
+        self.features = np.zeros((len(games), len(FEATURES)), dtype=np.float32)
+        self.encoders = [ObservationEncoder(game, self.grids[i], self.features[i])
+                         for i, game in enumerate(games)]
+
+    def update(self):
+        for encoder in self.encoders:
+            encoder.update()
+        return self.grids, self.features
+
+
+class SnakeEnv:
+    """A Gym-style wrapper around engine.Game
+
+    Actions are indices into engine.DIRECTIONS, or NOOP to keep going. The
+    reward for a step is the points scored on it.
+    """
+    def __init__(self, grid_width=engine.GRID_WIDTH, grid_height=engine.GRID_HEIGHT, seed=None):
+        self.game = engine.Game(grid_width, grid_height, seed=seed)
+        self.encoder = ObservationEncoder(self.game)
+
+    def reset(self, seed=None):
+        self.game.reset(seed)
+        return self.encoder.update()
+
+    def step(self, action=NOOP):
+        game = self.game
+        score = game.snake.score
+        alive = game.step(engine.DIRECTIONS[action] if action != NOOP else None)
+        info = {"cause": "won" if game.won else game.death_cause, "ticks": game.ticks}
+        return self.encoder.update(), game.snake.score - score, not alive, info
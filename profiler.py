@@ -0,0 +1,138 @@
+"""Frame and tick timings for the game loop.
+
+Profiler keeps per-frame totals for a fixed set of named sections. Code is
+timed either by wrapping a function or method with instrument() (the
+wrapper is only installed while the profiler is on, so a disabled profiler
+costs nothing) or with begin()/end() around a block in the loop itself.
+
+Rolling p50/p95/p99 over the last window frames feed the in-game overlay,
+and every frame can be written to a CSV file for offline analysis:
+
+    python snake_game.py --profile --profile-csv frames.csv
+"""
+import csv
+import time
+from collections import deque
+
+# Everything the game loop reports, in overlay and CSV column order
+SECTIONS = ("events", "update", "spawn", "Snake.render", "Reward.render",
+            "draw_score", "draw_scoreboard", "display.flip")
+WINDOW = 240  # Frames the rolling percentiles cover (4 seconds at 60 FPS)
+PERCENTILES = (50, 95, 99)
+
+_MISSING = object()
+
+
+def percentile(sorted_samples, p):
+    """Nearest-rank percentile of an already sorted list"""
+    i = max(0, min(len(sorted_samples) - 1, -(-p * len(sorted_samples) // 100) - 1))
+    return sorted_samples[i]
+
+
+class Profiler:
+    def __init__(self, sections=SECTIONS, window=WINDOW, clock=time.perf_counter):
+        self.sections = sections
+        self.clock = clock
+        self.enabled = False
+        self.frames = 0
+        self.current = dict.fromkeys(sections, 0.0)  # Seconds spent in each section this frame
+        self.history = {name: deque(maxlen=window) for name in ("frame",) + sections}
+        self._frame_start = None
+        self._starts = {}
+        self._targets = []  # (object, attribute, section)
+        self._originals = []  # (object, attribute, value before patching or _MISSING)
+        self._csv_file = None
+        self._csv = None
+
+    def instrument(self, obj, attr, section):
+        """Time every call to obj.attr under section while the profiler is on"""
+        self._targets.append((obj, attr, section))
+        if self.enabled:
+            self._patch(obj, attr, section)
+
+    def _patch(self, obj, attr, section):
+        function = getattr(obj, attr)
+        current = self.current
+        clock = self.clock
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                current[section] += clock() - start
+
+        self._originals.append((obj, attr, vars(obj).get(attr, _MISSING)))
+        setattr(obj, attr, timed)
+
+    def start(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for target in self._targets:
+            self._patch(*target)
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        # Undo in reverse, in case something was instrumented twice
+        for obj, attr, original in reversed(self._originals):
+            if original is _MISSING:
+                delattr(obj, attr)  # It came from the class
+            else:
+                setattr(obj, attr, original)
+        self._originals = []
+        self._frame_start = None
+
+    def toggle(self):
+        if self.enabled:
+            self.stop()
+        else:
+            self.start()
+
+    def begin(self, section):
+        if self.enabled:
+            self._starts[section] = self.clock()
+
+    def end(self, section):
+        if self.enabled and section in self._starts:
+            self.current[section] += self.clock() - self._starts.pop(section)
+
+    def start_frame(self):
+        if self.enabled:
+            self._frame_start = self.clock()
+
+    def end_frame(self):
+        """Close the frame: record its sections, and write them out if exporting"""
+        if not self.enabled or self._frame_start is None:
+            return
+        frame = self.clock() - self._frame_start
+        self.frames += 1
+        self.history["frame"].append(frame)
+        for section, seconds in self.current.items():
+            self.history[section].append(seconds)
+            self.current[section] = 0.0
+        if self._csv is not None:
+            self._csv.writerow([self.frames, f"{frame * 1000:.3f}"]
+                               + [f"{self.history[section][-1] * 1000:.3f}" for section in self.sections])
+
+    def percentiles(self, name):
+        """Rolling (p50, p95, p99) of a section (or "frame") in milliseconds, or None"""
+        samples = sorted(self.history[name])
+        if not samples:
+            return None
+        return tuple(percentile(samples, p) * 1000 for p in PERCENTILES)
+
+    def export(self, path):
+        """Write one CSV row per profiled frame to path from now on"""
+        self.close()
+        self._csv_file = open(path, "w", newline="")
+        self._csv = csv.writer(self._csv_file)
+        self._csv.writerow(["frame", "frame_ms"] + [f"{section}_ms" for section in self.sections])
+
+    def close(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv = None
@@ -0,0 +1,317 @@
+"""Compact binary replays.
+
+A game is fully determined by its seed and the direction the snake was
+heading on each tick, so a replay stores just that: the seed, then one
+byte per tick (0 for "no turn", otherwise 1 + the index of the new
+direction in engine.DIRECTIONS). Every snapshot_interval ticks the full
+game state is saved as well, so seeking to tick 100000 restores the
+nearest snapshot and simulates at most one interval forward.
+
+File layout (little-endian):
+
+    header      HEADER, fixed size, includes the final score/length/ticks
+    inputs      ticks bytes
+    index       snapshot_count x SNAPSHOT_ENTRY (tick, offset, size)
+    snapshots   packed game states
+
+Replay opens files with mmap, and read_header() reads just the header,
+so scanning a directory of thousands of replays for stats is cheap.
+
+    python replay.py stats replays/
+    python replay.py verify replays/some.snkr
+    python replay.py seek replays/some.snkr 100000
+"""
+import argparse
+import bisect
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import engine
+
+MAGIC = b"SNKR"
+VERSION = 1
+SNAPSHOT_INTERVAL = 1000
+
+# magic, version, width, height, seed, ticks, score, length, cause,
+# reward chance, reward duration, snapshot interval, snapshot count
+HEADER = struct.Struct("<4sHHHQIIIBdIII")
+SNAPSHOT_ENTRY = struct.Struct("<IQI")
+# ticks, direction, length, score, speed, food cell, reward active/type/timer/points/cell,
+# body size; followed by the body cells, the free-cell index and the RNG state
+STATE = struct.Struct("<IBIIIIBBiIII")
+RNG_STATE = struct.Struct("<d")  # Cached gauss value (NaN for None), after 625 uint32 words
+
+CAUSES = (None, "wall", "self", "won")
+
+NO_TURN = 0
+
+
+def pack_state(game):
+    """Serialize everything needed to continue a game from its current tick"""
+    snake = game.snake
+    reward = game.reward
+    width = game.grid_width
+    food_x, food_y = game.food.position
+    reward_x, reward_y = reward.position
+    body = array("I", (y * width + x for x, y in snake.positions))
+    version, words, gauss = game.rng.getstate()
+    return b"".join([
+        STATE.pack(game.ticks, engine.DIRECTIONS.index(snake.direction), snake.length,
+                   snake.score, snake.speed, food_y * width + food_x,
+                   reward.active, reward.type, reward.timer, reward.points,
+                   reward_y * width + reward_x, len(body)),
+        body.tobytes(),
+        # Spawns pick from the free-cell index by position, so its order matters too
+        array("I", snake.free.cells).tobytes(),
+        array("I", words).tobytes(),
+        RNG_STATE.pack(math.nan if gauss is None else gauss),
+    ])
+
+
+def unpack_state(game, data):
+    """Put a game back in a state saved by pack_state"""
+    (ticks, direction, length, score, speed, food, reward_active, reward_type,
+     reward_timer, reward_points, reward_cell, body_size) = STATE.unpack_from(data)
+    width = game.grid_width
+    offset = STATE.size
+    body = array("I")
+    body.frombytes(data[offset:offset + body_size * 4])
+    offset += body_size * 4
+    cells = game.grid_width * game.grid_height
+    free_cells = array("I")
+    free_cells.frombytes(data[offset:offset + cells * 4])
+    offset += cells * 4
+    words = array("I")
+    words.frombytes(data[offset:offset + 625 * 4])
+    gauss, = RNG_STATE.unpack_from(data, offset + 625 * 4)
+
+    snake = game.snake
+    snake.set_positions((cell % width, cell // width) for cell in body)
+    snake.length = length
+    snake.direction = engine.DIRECTIONS[direction]
+    snake.score = score
+    snake.speed = speed
+    snake.collision = None
+    free = snake.free
+    free.cells = array(free.cells.typecode, free_cells)
+    slots = free.slots
+    for slot, cell in enumerate(free_cells):
+        slots[cell] = slot
+    free.count = cells - body_size
+    game.food.position = (food % width, food // width)
+    reward = game.reward
+    reward.active = bool(reward_active)
+    reward.type = reward_type
+    reward.timer = reward_timer
+    reward.points = reward_points
+    reward.position = (reward_cell % width, reward_cell // width)
+    game.rng.setstate((3, tuple(words), None if math.isnan(gauss) else gauss))
+    game.ticks = ticks
+    game.game_over = False
+    game.won = False
+    game.death_cause = None
+    game.ate_food = False
+    game.reward_collected = 0
+
+
+class Recorder:
+    """Records a game as it is played
+
+    Call start() after the game is reset and step() instead of game.step();
+    turns queued with game.queue_turn() or made with snake.change_direction()
+    in between are picked up.
+    """
+    def __init__(self, game, snapshot_interval=None):
+        self.game = game
+        if snapshot_interval is None:
+            # A snapshot costs 4 bytes per board cell; on big boards take them
+            # less often so they stay a few bytes per tick
+            snapshot_interval = max(SNAPSHOT_INTERVAL, game.grid_width * game.grid_height // 4)
+        self.snapshot_interval = snapshot_interval
+        self.start()
+
+    def start(self):
+        self.seed = self.game.seed
+        self.inputs = array("B")
+        self.snapshots = []  # (tick, packed state)
+        self.direction = self.game.snake.direction
+
+    def step(self, direction=None):
+        game = self.game
+        if direction is None:
+            direction = game.turns.pop(game.ticks)
+        if direction is not None:
+            game.snake.change_direction(direction)
+        if game.snake.direction != self.direction:
+            self.direction = game.snake.direction
+            self.inputs.append(engine.DIRECTIONS.index(self.direction) + 1)
+        else:
+            self.inputs.append(NO_TURN)
+
+        alive = game.step(direction)
+        if alive and game.ticks % self.snapshot_interval == 0:
+            self.snapshots.append((game.ticks, pack_state(game)))
+        return alive
+
+    def save(self, path):
+        game = self.game
+        if game.won:
+            cause = CAUSES.index("won")
+        else:
+            cause = CAUSES.index(game.death_cause)
+        header = HEADER.pack(
+            MAGIC, VERSION, game.grid_width, game.grid_height, self.seed,
+            len(self.inputs), game.snake.score, len(game.snake.positions), cause,
+            game.reward_chance, game.reward.duration, self.snapshot_interval,
+            len(self.snapshots))
+
+        offset = HEADER.size + len(self.inputs) + SNAPSHOT_ENTRY.size * len(self.snapshots)
+        index = []
+        for tick, state in self.snapshots:
+            index.append(SNAPSHOT_ENTRY.pack(tick, offset, len(state)))
+            offset += len(state)
+
+        with open(path, "wb") as f:
+            f.write(header)
+            f.write(self.inputs.tobytes())
+            f.write(b"".join(index))
+            for _, state in self.snapshots:
+                f.write(state)
+
+
+def read_header(path):
+    """Read the summary of a replay without loading the rest of it"""
+    with open(path, "rb") as f:
+        data = f.read(HEADER.size)
+    return _header(data, path)
+
+
+def _header(data, path):
+    (magic, version, width, height, seed, ticks, score, length, cause, reward_chance,
+     reward_duration, snapshot_interval, snapshot_count) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} replay")
+    return {
+        "grid_width": width, "grid_height": height, "seed": seed, "ticks": ticks,
+        "score": score, "length": length, "cause": CAUSES[cause],
+        "reward_chance": reward_chance, "reward_duration": reward_duration,
+        "snapshot_interval": snapshot_interval, "snapshot_count": snapshot_count,
+    }
+
+
+class Replay:
+    """A replay file, memory-mapped"""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = _header(self._map, path)
+        self.ticks = self.header["ticks"]
+        self.inputs = memoryview(self._map)[HEADER.size:HEADER.size + self.ticks]
+        index_start = HEADER.size + self.ticks
+        self.snapshot_ticks = []
+        self._snapshot_spans = []
+        for i in range(self.header["snapshot_count"]):
+            tick, offset, size = SNAPSHOT_ENTRY.unpack_from(self._map, index_start + i * SNAPSHOT_ENTRY.size)
+            self.snapshot_ticks.append(tick)
+            self._snapshot_spans.append((offset, size))
+
+    def close(self):
+        self.inputs.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def new_game(self, game_class=engine.Game):
+        """A game at tick 0 of this replay"""
+        header = self.header
+        game = game_class(header["grid_width"], header["grid_height"], seed=header["seed"])
+        game.reward_chance = header["reward_chance"]
+        game.reward.duration = header["reward_duration"]
+        return game
+
+    def step(self, game):
+        """Play the next recorded tick on a game; return False once the game is over"""
+        code = self.inputs[game.ticks]
+        return game.step(engine.DIRECTIONS[code - 1] if code != NO_TURN else None)
+
+    def seek(self, game, tick):
+        """Move a game (from new_game) to the given tick, via the nearest snapshot"""
+        tick = min(tick, self.ticks)
+        if tick < game.ticks or game.game_over:
+            game.reset(self.header["seed"])
+        # Latest snapshot at or before the target, if it's ahead of where we are
+        i = bisect.bisect_right(self.snapshot_ticks, tick) - 1
+        if i >= 0 and self.snapshot_ticks[i] > game.ticks:
+            offset, size = self._snapshot_spans[i]
+            unpack_state(game, self._map[offset:offset + size])
+        while game.ticks < tick and self.step(game):
+            pass
+        return game
+
+    def play(self, game=None):
+        """Yield a game after every tick, from the start to the end"""
+        game = game or self.new_game()
+        yield game
+        while game.ticks < self.ticks and self.step(game):
+            yield game
+        yield game
+
+
+def replay_paths(path):
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".snkr"))
+    return [path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and check replays")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats_command = commands.add_parser("stats", help="summarize a directory of replays")
+    stats_command.add_argument("path")
+    verify_command = commands.add_parser("verify", help="re-simulate replays and check their results")
+    verify_command.add_argument("path")
+    seek_command = commands.add_parser("seek", help="show the game state at a tick")
+    seek_command.add_argument("path")
+    seek_command.add_argument("tick", type=int)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        headers = [read_header(path) for path in replay_paths(args.path)]
+        if not headers:
+            print("No replays found")
+            return 1
+        scores = sorted(header["score"] for header in headers)
+        causes = {}
+        for header in headers:
+            causes[header["cause"]] = causes.get(header["cause"], 0) + 1
+        print(f"{len(headers)} replays, {sum(h['ticks'] for h in headers)} ticks")
+        print(f"score: mean {sum(scores) / len(scores):.1f}, median {scores[len(scores) // 2]}, best {scores[-1]}")
+        print(f"causes: {causes}")
+    elif args.command == "verify":
+        failed = 0
+        for path in replay_paths(args.path):
+            with Replay(path) as replay:
+                game = replay.seek(replay.new_game(), replay.ticks)
+                ok = (game.snake.score == replay.header["score"] and game.ticks == replay.ticks)
+                print(f"{'ok  ' if ok else 'FAIL'} {path}: score {game.snake.score}, {game.ticks} ticks")
+                failed += not ok
+        return 1 if failed else 0
+    else:
+        with Replay(args.path) as replay:
+            game = replay.seek(replay.new_game(), args.tick)
+            print(f"tick {game.ticks}: score {game.snake.score}, length {len(game.snake.positions)}, "
+                  f"head {game.snake.get_head_position()}, food {game.food.position}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,118 +1,215 @@
-def load_scoreboard():
-    """Load the scoreboard from file"""
+"""High score board storage.
+
+The board lives in a small JSON file ({"high_scores": [{"name", "score"}]},
+best first). Scoreboard keeps it in memory so the game can ask about it
+every frame without touching the disk, writes it back only after it
+changes, and picks up changes other processes make to the file.
+
+Several games can share one file. Writes hold an advisory lock (a
+".lock" file next to the board) while they re-read the board, merge in
+their new scores and replace the file, so nobody's scores are written
+over. Where fcntl is missing (Windows) there is no lock, and the last
+writer wins.
+"""
+import bisect
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SCOREBOARD_FILE = "scoreboard.json"
+SCOREBOARD_SIZE = 10
+FLUSH_INTERVAL = 0.5  # Seconds between writes from one process; scores added meanwhile go out together
+
+
+def load_scoreboard(path=SCOREBOARD_FILE):
+    """Load the scoreboard from file
+
+    A missing file is an empty board; a file that isn't a scoreboard raises
+    ValueError rather than passing for one.
+    """
     try:
-        with open(SCOREBOARD_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Return default scoreboard if file doesn't exist or is invalid
+        with open(path, 'r') as f:
+            scoreboard = json.load(f)
+    except FileNotFoundError:
         return {"high_scores": []}
+    except json.JSONDecodeError as error:
+        raise ValueError(f"{path} is not valid JSON ({error})") from None
+    if not isinstance(scoreboard, dict) or not isinstance(scoreboard.get("high_scores"), list):
+        raise ValueError(f"{path} has no high_scores list")
+    return scoreboard
+
+
+def save_scoreboard(scoreboard, path=SCOREBOARD_FILE):
+    """Save the scoreboard to file
+
+    The data goes to a temporary file that then replaces the real one, so a
+    crash mid-write never leaves a truncated board behind.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".scoreboard-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(scoreboard, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class Scoreboard:
+    """The top scores, kept in memory and written back when they change
+
+    Entries are kept best first, with the negated scores in a parallel
+    sorted list so "would this score make the board" and "at what rank"
+    are a bisect. add() shows a score on the board at once but only queues
+    it for the file; flush() merges everything queued into the file in one
+    locked write, so callers choose when the disk is touched and a burst of
+    scores costs one write. The file's mtime is checked at most every
+    refresh_interval seconds, and the board is reloaded if someone else
+    changed it.
+
+    A board file that can't be read is moved aside (see _read()) instead
+    of being taken for an empty board and written over.
+    """
+    def __init__(self, path=SCOREBOARD_FILE, size=SCOREBOARD_SIZE, refresh_interval=1.0,
+                 flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.flush_interval = flush_interval
+        self.pending = []  # Scores added but not yet in the file
+        self._mtime = None
+        self._checked = 0.0
+        self._flushed = None  # When this process last wrote the file
+        self._load()
+
+    @property
+    def dirty(self):
+        return bool(self.pending)
+
+    def _load(self):
+        self._mtime = self._file_mtime()
+        self._checked = time.monotonic()
+        self._set_entries(self._read())
+
+    def _set_entries(self, entries):
+        """Show the given entries plus our pending ones, top size first"""
+        # Sort by score (highest first) and keep only the top entries; the
+        # sort is stable, so pending scores go below equal ones already there
+        self.entries = sorted(entries + self.pending, key=lambda entry: entry["score"], reverse=True)[:self.size]
+        self._keys = [-entry["score"] for entry in self.entries]
+
+    @contextlib.contextmanager
+    def _locked(self, wait=True):
+        """Hold the board's lock; yields False instead if wait is off and another process has it"""
+        if fcntl is None:
+            yield True
+            return
+        with open(self.path + ".lock", "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            yield True  # Closing the file releases the lock
+
+    def _read(self, locked=False):
+        """The entries in the file
+
+        A damaged file is renamed to <path>.corrupt-<time>, with a warning,
+        so whoever looks after the board can recover it; the board starts
+        empty. The check is repeated under the lock (unless the caller
+        holds it already), in case another process replaced the file.
+        """
+        try:
+            return load_scoreboard(self.path)["high_scores"]
+        except ValueError as error:
+            if not locked:
+                with self._locked():
+                    return self._read(locked=True)
+            aside = f"{self.path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+            os.replace(self.path, aside)
+            print(f"{error}; moved it to {aside} and started a new scoreboard", file=sys.stderr)
+            return []
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """Reload the board if the file changed on disk since we last saw it"""
+        now = time.monotonic()
+        if now - self._checked < self.refresh_interval:
+            return
+        self._checked = now
+        if self._file_mtime() != self._mtime:
+            self._load()
+
+    @property
+    def high_scores(self):
+        self.refresh()
+        return self.entries
+
+    def rank(self, score):
+        """0-based position a new score would take, or -1 if it wouldn't make the board"""
+        self.refresh()
+        # Ties go below the scores already on the board
+        position = bisect.bisect_right(self._keys, -score)
+        return position if position < self.size else -1
+
+    def is_high_score(self, score):
+        """Check if score qualifies for the high score board"""
+        return self.rank(score) != -1
+
+    def add(self, name, score):
+        """Add a new score; return its position on the board (0-based), or -1
+
+        The position is the one on this process's view of the board; other
+        processes' scores merged in by flush() can still push it down.
+        """
+        position = self.rank(score)
+        if position == -1:
+            return -1
+        entry = {"name": name, "score": score}
+        self.pending.append(entry)
+        self.entries.insert(position, entry)
+        self._keys.insert(position, -score)
+        del self.entries[self.size:]
+        del self._keys[self.size:]
+        return position
+
+    def flush(self, wait=False):
+        """Merge the scores added since the last flush into the file; return True once none are left
 
-def save_scoreboard(scoreboard):
-    """Save the scoreboard to file"""
-    with open(SCOREBOARD_FILE, 'w') as f:
-        json.dump(scoreboard, f)
-
-def add_score_to_scoreboard(name, score):
-    """Add a new score to the scoreboard"""
-    scoreboard = load_scoreboard()
-    
-    # Add new score
-    scoreboard["high_scores"].append({"name": name, "score": score})
-    
-    # Sort by score (highest first) and keep only top 10
-    scoreboard["high_scores"] = sorted(
-        scoreboard["high_scores"], 
-        key=lambda x: x["score"], 
-        reverse=True
-    )[:10]
-    
-    # Save updated scoreboard
-    save_scoreboard(scoreboard)
-    
-    # Return position in scoreboard (0-based)
-    for i, entry in enumerate(scoreboard["high_scores"]):
-        if entry["name"] == name and entry["score"] == score:
-            return i
-    
-    return -1  # Not in top 10
-
-def is_high_score(score):
-    """Check if score qualifies for the high score board"""
-    scoreboard = load_scoreboard()
-    
-    # If we have fewer than 10 scores, any score qualifies
-    if len(scoreboard["high_scores"]) < 10:
+        The file is re-read under the lock and the new scores merged into it,
+        so scores other processes wrote meanwhile are kept. Without wait, the
+        write is put off (the scores stay queued) if this process wrote less
+        than flush_interval seconds ago or another one holds the lock, so a
+        game can call this every frame without stalling on the disk.
+        """
+        if not self.pending:
+            return True
+        now = time.monotonic()
+        if not wait and self._flushed is not None and now - self._flushed < self.flush_interval:
+            return False
+        with self._locked(wait) as locked:
+            if not locked:
+                return False
+            self._set_entries(self._read(locked=True))
+            save_scoreboard({"high_scores": self.entries}, self.path)
+            self._mtime = self._file_mtime()
+        self.pending = []
+        self._checked = self._flushed = now
         return True
-    
-    # Otherwise, check if score is higher than the lowest score
-    return score > min(entry["score"] for entry in scoreboard["high_scores"])
-
-def draw_scoreboard(surface):
-    """Draw the scoreboard on the screen"""
-    scoreboard = load_scoreboard()
-    
-    # Draw title
-    title_text = large_font.render("HIGH SCORES", True, GOLD)
-    surface.blit(title_text, (WIDTH//2 - title_text.get_width()//2, 100))
-    
-    # Draw scores
-    y_pos = 170
-    for i, entry in enumerate(scoreboard["high_scores"]):
-        # Determine color (gold for top 3, white for others)
-        color = GOLD if i < 3 else WHITE
-        
-        # Format the entry
-        rank_text = font.render(f"{i+1}.", True, color)
-        name_text = font.render(f"{entry['name']}", True, color)
-        score_text = font.render(f"{entry['score']}", True, color)
-        
-        # Position and draw
-        surface.blit(rank_text, (WIDTH//2 - 150, y_pos))
-        surface.blit(name_text, (WIDTH//2 - 100, y_pos))
-        surface.blit(score_text, (WIDTH//2 + 100, y_pos))
-        
-        y_pos += 30
-    
-    # Draw instruction to return
-    back_text = font.render("Press SPACE to return", True, WHITE)
-    surface.blit(back_text, (WIDTH//2 - back_text.get_width()//2, HEIGHT - 50))
-
-def get_player_name(surface, score):
-    """Get player name for high score entry"""
-    name = ""
-    entering_name = True
-    
-    while entering_name:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN and name:
-                    entering_name = False
-                elif event.key == pygame.K_BACKSPACE:
-                    name = name[:-1]
-                elif event.unicode.isalnum() and len(name) < 10:
-                    name += event.unicode
-        
-        # Clear screen
-        surface.fill(BLACK)
-        
-        # Draw title
-        title_text = large_font.render("NEW HIGH SCORE!", True, GOLD)
-        score_text = font.render(f"Your score: {score}", True, WHITE)
-        prompt_text = font.render("Enter your name:", True, WHITE)
-        name_text = font.render(name + "_", True, WHITE)
-        enter_text = font.render("Press ENTER when done", True, WHITE)
-        
-        surface.blit(title_text, (WIDTH//2 - title_text.get_width()//2, 150))
-        surface.blit(score_text, (WIDTH//2 - score_text.get_width()//2, 220))
-        surface.blit(prompt_text, (WIDTH//2 - prompt_text.get_width()//2, 270))
-        surface.blit(name_text, (WIDTH//2 - name_text.get_width()//2, 320))
-        surface.blit(enter_text, (WIDTH//2 - enter_text.get_width()//2, 370))
-        
-        pygame.display.flip()
-        clock.tick(30)
-    
-    return name if name else "Player"
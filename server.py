@@ -0,0 +1,308 @@
+"""Host a game over TCP for a player and any number of spectators.
+
+The server runs the one authoritative engine.Game at the snake's speed (or
+a fixed --tick-rate) and streams it as newline-delimited JSON. A client
+gets the full state once when it connects, then one small delta per tick:
+
+    {"type":"state","tick":0,"width":26,"height":20,"snake":[[5,10],...],
+     "score":0,"food":[3,4],"reward":null,"over":null}
+    {"type":"tick","tick":1,"h":[6,10],"x":[3,10]}   new head, removed tail
+    {"type":"tick","tick":2,"h":[7,10],"f":[12,2],"s":10}   ate: new food, score
+    {"type":"tick","tick":3,"h":[8,10],"x":[4,10],"r":[9,9,1]}   reward appeared
+    {"type":"over","tick":40,"cause":"wall","score":30}
+
+"r" is null when the reward goes away. After a game ends a new one starts
+RESTART_DELAY seconds later with a fresh "state" message.
+
+Each delta is encoded once and the same bytes are queued for every client.
+A client's queue holds at most queue_size messages; a reader too slow to
+keep up has its backlog thrown away and gets a fresh "state" instead,
+so memory per client stays bounded and the tick loop never waits on
+anyone. A client whose socket stays full for STALL_TIMEOUT seconds is
+disconnected.
+
+Clients send lines of "up", "down", "left" or "right". The first client to
+send one becomes the player; everyone else only watches.
+
+    python server.py serve [--port 8765] [--board 40x30] [--tick-rate 20]
+    python server.py watch [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import socket
+import sys
+from collections import deque
+
+import engine
+
+HOST = "127.0.0.1"
+PORT = 8765
+QUEUE_SIZE = 64  # Messages waiting for one client before it is resynced
+WRITE_BUFFER = 64 * 1024  # Bytes the transport holds for one client before we wait on it
+SOCKET_BUFFER = 64 * 1024  # Kernel send buffer per client (instead of growing to megabytes)
+STALL_TIMEOUT = 10  # Seconds a client can go without reading before it is dropped
+RESTART_DELAY = 2  # Seconds between the end of a game and the next one
+MAX_LINE = 1024  # Longest line accepted from a client
+BACKLOG = 1024  # Connections waiting to be accepted, for crowds joining at once
+
+TURNS = {"up": engine.UP, "down": engine.DOWN, "left": engine.LEFT, "right": engine.RIGHT}
+
+
+def encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+def reward_state(reward):
+    return [*reward.position, reward.type] if reward.active else None
+
+
+class Client:
+    """One connection: an input reader and a bounded outgoing queue"""
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.pending = deque()  # Encoded messages not yet handed to the transport
+        self.wake = asyncio.Event()
+        self.resync = True  # The next write is a full state instead of the queue
+        self.resyncs = 0  # Times the client fell behind
+        self.wake.set()
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER)
+
+    def send(self, data):
+        if self.resync:
+            return  # A full state is coming, which covers this
+        if len(self.pending) >= self.server.queue_size:
+            self.pending.clear()
+            self.resync = True
+            self.resyncs += 1
+        else:
+            self.pending.append(data)
+        self.wake.set()
+
+    async def write_loop(self):
+        writer = self.writer
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            if self.resync:
+                self.resync = False
+                self.pending.clear()
+                data = self.server.snapshot()
+            else:
+                data = b"".join(self.pending)
+                self.pending.clear()
+            writer.write(data)
+            await asyncio.wait_for(writer.drain(), STALL_TIMEOUT)
+
+    async def read_loop(self):
+        server = self.server
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            direction = TURNS.get(line.strip().decode(errors="replace").lower())
+            if direction is None:
+                continue
+            if server.player is None:
+                server.player = self
+            if server.player is self:
+                server.game.queue_turn(direction)
+
+
+class Server:
+    """Runs a game and broadcasts it to every connected client"""
+    def __init__(self, grid_width=engine.GRID_WIDTH, grid_height=engine.GRID_HEIGHT, seed=None,
+                 tick_rate=None, queue_size=QUEUE_SIZE):
+        self.game = engine.Game(grid_width, grid_height, seed=seed)
+        self.tick_rate = tick_rate  # None follows the snake's speed
+        self.queue_size = queue_size
+        self.clients = set()
+        self.player = None
+        self.restart_at = None
+        self._snapshot = None  # ((seed, ticks, over), encoded state), reused until the game moves on
+
+    def snapshot(self):
+        """The full game state, encoded"""
+        game = self.game
+        key = (game.seed, game.ticks, game.game_over)
+        if self._snapshot is None or self._snapshot[0] != key:
+            cause = ("won" if game.won else game.death_cause) if game.game_over else None
+            self._snapshot = key, encode({
+                "type": "state", "tick": game.ticks, "width": game.grid_width, "height": game.grid_height,
+                "snake": list(game.snake.positions), "score": game.snake.score,
+                "food": game.food.position, "reward": reward_state(game.reward), "over": cause,
+            })
+        return self._snapshot[1]
+
+    def broadcast(self, message):
+        data = encode(message)
+        for client in self.clients:
+            client.send(data)
+
+    def tick(self, now):
+        """Advance the game one tick and broadcast what changed"""
+        game = self.game
+        if game.game_over:
+            if now >= self.restart_at:
+                game.reset()
+                data = self.snapshot()
+                for client in self.clients:
+                    client.send(data)
+            return
+
+        snake = game.snake
+        reward_before = reward_state(game.reward)
+        score_before = snake.score
+        if not game.step():
+            self.restart_at = now + RESTART_DELAY
+            self.broadcast({"type": "over", "tick": game.ticks,
+                            "cause": "won" if game.won else game.death_cause, "score": snake.score})
+            return
+
+        delta = {"type": "tick", "tick": game.ticks, "h": snake.positions[0]}
+        if snake.last_tail is not None:
+            delta["x"] = snake.last_tail
+        if game.ate_food:
+            delta["f"] = game.food.position
+        reward = reward_state(game.reward)
+        if reward != reward_before:
+            delta["r"] = reward
+        if snake.score != score_before:
+            delta["s"] = snake.score
+        self.broadcast(delta)
+
+    async def run(self):
+        """Tick forever at the game's speed"""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += 1 / (self.tick_rate or self.game.snake.speed)
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time()  # Fell behind; don't try to catch up in a burst
+            self.tick(next_tick)
+
+    async def handle(self, reader, writer):
+        client = Client(self, reader, writer)
+        self.clients.add(client)
+        tasks = [asyncio.create_task(client.read_loop()), asyncio.create_task(client.write_loop())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.clients.discard(client)
+            if self.player is client:
+                self.player = None
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.TimeoutError):
+                pass
+
+    async def listen(self, host=HOST, port=PORT):
+        """Start accepting clients; port 0 picks a free one (see listener.sockets)"""
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_LINE, backlog=BACKLOG)
+
+    async def serve(self, host=HOST, port=PORT):
+        """Accept clients and run the game until cancelled"""
+        async with await self.listen(host, port):
+            await self.run()
+
+
+class Mirror:
+    """A client's copy of the game, rebuilt from the server's messages"""
+    def __init__(self):
+        self.tick = None
+        self.snake = deque()
+        self.score = 0
+        self.food = None
+        self.reward = None
+        self.over = None
+        self.states = 0  # Full states received (1 + resyncs + restarts)
+
+    def apply(self, message):
+        kind = message["type"]
+        if kind == "tick":
+            self.snake.appendleft(tuple(message["h"]))
+            if "x" in message:
+                self.snake.pop()
+            if "f" in message:
+                self.food = tuple(message["f"])
+            if "r" in message:
+                self.reward = message["r"]
+            if "s" in message:
+                self.score = message["s"]
+        elif kind == "state":
+            self.states += 1
+            self.width = message["width"]
+            self.height = message["height"]
+            self.snake = deque(tuple(cell) for cell in message["snake"])
+            self.score = message["score"]
+            self.food = tuple(message["food"])
+            self.reward = message["reward"]
+            self.over = message["over"]
+        elif kind == "over":
+            self.over = message["cause"]
+            self.score = message["score"]
+        self.tick = message["tick"]
+
+
+async def watch(host=HOST, port=PORT, mirror=None):
+    """Follow a game, printing one line per game that ends"""
+    mirror = mirror or Mirror()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return mirror
+            message = json.loads(line)
+            mirror.apply(message)
+            if message["type"] == "over":
+                print(f"game over at tick {mirror.tick}: {mirror.over}, score {mirror.score}, "
+                      f"length {len(mirror.snake)}")
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host or watch a game over TCP")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_command = commands.add_parser("serve", help="run a game for clients to play and watch")
+    serve_command.add_argument("--host", default=HOST)
+    serve_command.add_argument("--port", type=int, default=PORT)
+    serve_command.add_argument("--board", default=None, help="WIDTHxHEIGHT")
+    serve_command.add_argument("--seed", type=int, default=None)
+    serve_command.add_argument("--tick-rate", type=float, default=None,
+                               help="ticks per second (default: the snake's speed)")
+    watch_command = commands.add_parser("watch", help="follow a game on a server")
+    watch_command.add_argument("--host", default=HOST)
+    watch_command.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "serve":
+            width, height = engine.GRID_WIDTH, engine.GRID_HEIGHT
+            if args.board:
+                width, height = (int(part) for part in args.board.lower().split("x"))
+            server = Server(width, height, seed=args.seed, tick_rate=args.tick_rate)
+            print(f"Serving a {width}x{height} game on {args.host}:{args.port}")
+            asyncio.run(server.serve(args.host, args.port))
+        else:
+            asyncio.run(watch(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,48 @@
+import time
+
+STARTED = time.perf_counter()  # For measuring time to the first frame
+
+import argparse
+import json
 import pygame
-import random
 import sys
-import time
 import os
 import math
-import json
+from collections import OrderedDict
+from functools import cached_property
 from pygame import mixer
 
-# Initialize pygame
-pygame.init()
-mixer.init()
+import engine
+from autopilot import Autopilot
+from engine import UP, DOWN, LEFT, RIGHT
+from leaderboard import LEADERBOARD_FILE, Leaderboard
+from profiler import Profiler
+from replay import Recorder, Replay
+from scoreboard import SCOREBOARD_FILE, Scoreboard
 
 # Constants
 WIDTH, HEIGHT = 800, 600
 GRID_SIZE = 30  # Increased from 20 to 30 for bigger blocks
 GRID_WIDTH = WIDTH // GRID_SIZE
 GRID_HEIGHT = HEIGHT // GRID_SIZE
-FPS = 8  # Slightly reduced speed to compensate for larger blocks
 
-# Scoreboard file
-SCOREBOARD_FILE = "scoreboard.json"
+# Every finished game is saved here as a replay
+REPLAY_DIR = "replays"
+
+# --board sizes; the rules keep about 13 bytes per cell (52 MB at the largest)
+MAX_BOARD_SIDE = 2000
+PACKED_BODY_CELLS = 1000 * 1000  # Boards this big keep the snake's body bit-packed
+
+# Assets
+SOUND_DIR = "sounds"
+SOUNDS = ("eat", "game_over", "reward")
+FONT_NAME = "arial"
+FONT_CACHE_FILE = ".fontcache.json"  # Where FONT_NAME was found last time
+
+# Frames are drawn at display rate; the game itself ticks at snake.speed
+RENDER_FPS = 60
+MAX_TICKS_PER_FRAME = 5  # After a stall, skip ahead rather than fast-forward
+AUTOPILOT_RESTART_DELAY = 3000  # Milliseconds the autopilot waits on the game over screen
 
 # Colors
 BLACK = (0, 0, 0)
@@ -32,196 +55,91 @@ YELLOW = (255, 255, 0)
 PURPLE = (200, 0, 255)
 GOLD = (255, 215, 0)
 CYAN = (0, 255, 255)
+DARK_GRAY = (80, 80, 80)
 
-# Direction constants
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
-
-# Set up display
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Classic Snake Game")
-clock = pygame.time.Clock()
-
-# Sound settings
-sound_enabled = True
-
-# Load sounds
-try:
-    eat_sound = mixer.Sound('sounds/eat.wav')
-    game_over_sound = mixer.Sound('sounds/game_over.wav')
-    reward_sound = mixer.Sound('sounds/reward.wav')  # New sound for special rewards
-    sound_files_exist = True
-except:
-    # Create a directory for sounds if it doesn't exist
-    if not os.path.exists('sounds'):
-        os.makedirs('sounds')
-    
-    # Create placeholder sounds
-    eat_sound = mixer.Sound(buffer=bytearray(100))
-    game_over_sound = mixer.Sound(buffer=bytearray(100))
-    reward_sound = mixer.Sound(buffer=bytearray(100))
-    sound_files_exist = False
-    print("Sound files not found. Using placeholder sounds.")
-
-# Font setup
-font = pygame.font.SysFont('arial', 25)
-small_font = pygame.font.SysFont('arial', 20)
-large_font = pygame.font.SysFont('arial', 50)
-
-class Snake:
-    def __init__(self):
-        self.reset()
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces
     
-    def reset(self):
-        # Start with 3 segments in the middle of the screen
-        self.length = 3
-        self.positions = [
-            (GRID_WIDTH // 2, GRID_HEIGHT // 2),
-            (GRID_WIDTH // 2 - 1, GRID_HEIGHT // 2),
-            (GRID_WIDTH // 2 - 2, GRID_HEIGHT // 2)
+    The HUD, overlays and scoreboard draw the same few strings every frame;
+    each (font, text, color) is rendered once and reused until it falls out
+    of the cache. hits and misses count lookups, for profiling.
+    """
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def render(self, text_font, text, color):
+        key = (text_font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        self.misses += 1
+        surface = self.surfaces[key] = text_font.render(text, True, color)
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+text_cache = TextCache()
+
+def render_text(text_font, text, color):
+    """Render anti-aliased text through the shared cache"""
+    return text_cache.render(text_font, text, color)
+
+class SpriteAtlas:
+    """Snake, food and reward shapes rasterized once at startup
+    
+    Drawing a frame is then just blitting these surfaces. The reward's
+    pulse is quantized to half-pixel steps, with one sprite per reward
+    type per step, label included.
+    """
+    PULSE_STEPS = 11  # Pulse of 0 to 5 pixels in half-pixel steps
+    REWARD_SIZE = GRID_SIZE * 3  # Star, glow and label all fit in 3x3 cells
+    
+    def __init__(self):
+        self.segments = {}
+        self.food = self.draw_food()
+        self.rewards = [
+            [self.draw_reward(color, points, step / 2) for step in range(self.PULSE_STEPS)]
+            for color, points in zip(Reward.COLORS, engine.REWARD_POINTS)
         ]
-        self.direction = RIGHT
-        self.color = GREEN
-        self.score = 0
-        self.speed = FPS
-    
-    def get_head_position(self):
-        return self.positions[0]
-    
-    def update(self):
-        # Get current head position
-        current = self.get_head_position()
-        x, y = self.direction
-        
-        # Calculate new head position
-        new_x = (current[0] + x)
-        new_y = (current[1] + y)
-        new_position = (new_x, new_y)
-        
-        # Check for wall collision
-        if (new_x < 0 or new_x >= GRID_WIDTH or 
-            new_y < 0 or new_y >= GRID_HEIGHT):
-            return False  # Game over
-        
-        # Check for self collision
-        if new_position in self.positions[1:]:
-            return False  # Game over
-        
-        # Move snake
-        self.positions.insert(0, new_position)
-        if len(self.positions) > self.length:
-            self.positions.pop()
-        
-        return True  # Game continues
-    
-    def render(self, surface):
-        for i, p in enumerate(self.positions):
-            # Draw each segment
-            color = DARK_GREEN if i == 0 else self.color  # Head is darker
+    
+    def segment(self, color):
+        """Sprite for one snake segment of the given color, covering its whole cell"""
+        sprite = self.segments.get(color)
+        if sprite is None:
+            sprite = pygame.Surface((GRID_SIZE, GRID_SIZE), pygame.SRCALPHA)
             
             # Create slightly smaller rectangle for better visual separation
             margin = 2  # Small margin for visual separation between segments
-            rect = pygame.Rect(
-                p[0] * GRID_SIZE + margin, 
-                p[1] * GRID_SIZE + margin, 
-                GRID_SIZE - (margin * 2), 
-                GRID_SIZE - (margin * 2)
-            )
+            rect = pygame.Rect(margin, margin, GRID_SIZE - (margin * 2), GRID_SIZE - (margin * 2))
             
             # Draw rounded rectangle for snake segments
-            pygame.draw.rect(surface, color, rect, border_radius=8)
-            pygame.draw.rect(surface, BLACK, rect, 1, border_radius=8)  # Border
+            pygame.draw.rect(sprite, color, rect, border_radius=8)
+            pygame.draw.rect(sprite, BLACK, rect, 1, border_radius=8)  # Border
+            sprite = self.segments[color] = sprite.convert_alpha()
+        return sprite
     
-    def change_direction(self, direction):
-        # Prevent reversing direction
-        if (direction[0] * -1, direction[1] * -1) == self.direction:
-            return
-        self.direction = direction
-
-class Food:
-    def __init__(self):
-        self.position = (0, 0)
-        self.color = RED
-        self.randomize_position()
-    
-    def randomize_position(self):
-        self.position = (
-            random.randint(0, GRID_WIDTH - 1),
-            random.randint(0, GRID_HEIGHT - 1)
-        )
-    
-    def render(self, surface):
-        # Draw food as a circle for visual distinction from snake
-        center_x = self.position[0] * GRID_SIZE + GRID_SIZE // 2
-        center_y = self.position[1] * GRID_SIZE + GRID_SIZE // 2
+    def draw_food(self):
+        """Sprite for the food, centered on the middle of the surface"""
         radius = GRID_SIZE // 2 - 2  # Slightly smaller than grid cell
+        size = (radius + 4) * 2
+        center = (size // 2, size // 2)
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
         
         # Draw food with a glow effect
-        pygame.draw.circle(surface, (255, 150, 150), (center_x, center_y), radius + 3)  # Outer glow
-        pygame.draw.circle(surface, self.color, (center_x, center_y), radius)  # Main food
-
-class Reward:
-    def __init__(self):
-        self.position = (0, 0)
-        self.active = False
-        self.timer = 0
-        self.duration = 150  # Increased duration (150 frames instead of 100)
-        self.points = 0
-        self.type = 0
-        self.color = GOLD
-    
-    def activate(self, snake_positions):
-        """Activate a new random reward"""
-        self.active = True
-        self.timer = self.duration
-        
-        # Randomize reward type (0-2)
-        self.type = random.randint(0, 2)
-        
-        # Set reward properties based on type
-        if self.type == 0:  # Gold reward (50 points - increased from 30)
-            self.points = 50
-            self.color = GOLD
-        elif self.type == 1:  # Purple reward (100 points - increased from 50)
-            self.points = 100
-            self.color = PURPLE
-        else:  # Cyan reward (200 points - increased from 100)
-            self.points = 200
-            self.color = CYAN
-        
-        # Randomize position (not on snake)
-        self.randomize_position(snake_positions)
-    
-    def randomize_position(self, snake_positions):
-        """Randomize the reward position (not on snake)"""
-        while True:
-            self.position = (
-                random.randint(0, GRID_WIDTH - 1),
-                random.randint(0, GRID_HEIGHT - 1)
-            )
-            if self.position not in snake_positions:
-                break
-    
-    def update(self):
-        """Update reward timer"""
-        if self.active:
-            self.timer -= 1
-            if self.timer <= 0:
-                self.active = False
-    
-    def render(self, surface):
-        """Render the reward if active"""
-        if not self.active:
-            return
-            
-        # Calculate center position
-        center_x = self.position[0] * GRID_SIZE + GRID_SIZE // 2
-        center_y = self.position[1] * GRID_SIZE + GRID_SIZE // 2
-        
-        # Make the reward pulsate for visual effect
-        pulse = abs(math.sin(pygame.time.get_ticks() * 0.01)) * 5
+        pygame.draw.circle(sprite, (255, 150, 150), center, radius + 3)  # Outer glow
+        pygame.draw.circle(sprite, RED, center, radius)  # Main food
+        return sprite.convert_alpha()
+    
+    def draw_reward(self, color, value, pulse):
+        """Sprite for a reward at one pulse size, centered on the middle of the surface"""
+        sprite = pygame.Surface((self.REWARD_SIZE, self.REWARD_SIZE), pygame.SRCALPHA)
+        center_x = center_y = self.REWARD_SIZE // 2
         radius = (GRID_SIZE // 2 - 4) + pulse
         
         # Draw reward with a star-like shape
@@ -234,84 +152,287 @@ class Reward:
             points.append((x, y))
         
         # Draw the star shape
-        pygame.draw.polygon(surface, self.color, points)
+        pygame.draw.polygon(sprite, color, points)
         
         # Draw a pulsating glow
         glow_radius = radius + 5 + pulse
-        pygame.draw.circle(surface, self.color, (center_x, center_y), glow_radius, 2)
+        pygame.draw.circle(sprite, color, (center_x, center_y), glow_radius, 2)
         
         # Draw points value
-        value_text = small_font.render(f"+{self.points}", True, WHITE)
-        surface.blit(value_text, (center_x - value_text.get_width()//2, center_y - value_text.get_height()//2))
+        value_text = render_text(app.small_font, f"+{value}", WHITE)
+        sprite.blit(value_text, (center_x - value_text.get_width()//2, center_y - value_text.get_height()//2))
+        return sprite.convert_alpha()
+
+class Camera:
+    """The part of the board that is on screen
+    
+    x and y are the board position at the top left of the window, in cells.
+    They are floats so the view can glide along with the head. Boards
+    narrower than the window are centered instead.
+    """
+    def __init__(self, grid_width, grid_height, view_width=WIDTH / GRID_SIZE, view_height=HEIGHT / GRID_SIZE):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.view_width = view_width
+        self.view_height = view_height
+        self.x = 0.0
+        self.y = 0.0
+    
+    def follow(self, position):
+        """Center the view on a (possibly fractional) cell, staying inside the board"""
+        self.x = self.clamp(position[0] + 0.5 - self.view_width / 2, self.grid_width, self.view_width)
+        self.y = self.clamp(position[1] + 0.5 - self.view_height / 2, self.grid_height, self.view_height)
+    
+    @staticmethod
+    def clamp(start, size, view):
+        if size <= view:
+            return (size - view) / 2
+        return min(max(start, 0.0), size - view)
+    
+    def to_screen(self, p):
+        """Pixel position of the top left corner of a (possibly fractional) cell"""
+        return (round(p[0] * GRID_SIZE) - round(self.x * GRID_SIZE),
+                round(p[1] * GRID_SIZE) - round(self.y * GRID_SIZE))
+    
+    def visible(self):
+        """(x0, y0, x1, y1): the cells at least partly on screen are x0 <= x < x1, y0 <= y < y1"""
+        return (math.floor(self.x), math.floor(self.y),
+                math.ceil(self.x + self.view_width), math.ceil(self.y + self.view_height))
+    
+    def can_see(self, p, margin=0):
+        x0, y0, x1, y1 = self.visible()
+        return x0 - margin <= p[0] < x1 + margin and y0 - margin <= p[1] < y1 + margin
+
+class Snake(engine.Snake):
+    def reset(self):
+        super().reset()
+        self.color = GREEN
+    
+    def render(self, surface, head=True, camera=None):
+        """Draw the snake; head=False leaves the head cell for the caller to draw
+        
+        With a camera only the cells in view are looked at, however long
+        the snake or big the board.
+        """
+        body = app.atlas.segment(self.color)
+        head_cell = self.positions[0]
+        if camera is None:
+            positions = iter(self.positions)
+            if not head:
+                next(positions)
+            surface.blits([(body, (x * GRID_SIZE, y * GRID_SIZE)) for x, y in positions], False)
+        else:
+            to_screen = camera.to_screen
+            surface.blits([(body, to_screen(cell)) for cell in self.cells_in(*camera.visible())
+                           if head or cell != head_cell], False)
+        if head:
+            self.render_segment(surface, head_cell, True, camera)
+    
+    def render_segment(self, surface, p, is_head, camera=None):
+        # Head is darker; p may be between cells while the snake is moving
+        sprite = app.atlas.segment(DARK_GREEN if is_head else self.color)
+        if camera is None:
+            surface.blit(sprite, (round(p[0] * GRID_SIZE), round(p[1] * GRID_SIZE)))
+        else:
+            surface.blit(sprite, camera.to_screen(p))
+
+class Food(engine.Food):
+    def render(self, surface, camera=None):
+        # Draw food as a circle for visual distinction from snake
+        if camera is None:
+            center_x = self.position[0] * GRID_SIZE + GRID_SIZE // 2
+            center_y = self.position[1] * GRID_SIZE + GRID_SIZE // 2
+        elif camera.can_see(self.position):
+            x, y = camera.to_screen(self.position)
+            center_x = x + GRID_SIZE // 2
+            center_y = y + GRID_SIZE // 2
+        else:
+            return
+        half = app.atlas.food.get_width() // 2
+        surface.blit(app.atlas.food, (center_x - half, center_y - half))
+
+class Reward(engine.Reward):
+    COLORS = (GOLD, PURPLE, CYAN)
+    
+    @property
+    def color(self):
+        return self.COLORS[self.type]
+    
+    def render(self, surface, camera=None):
+        """Render the reward if active (and, with a camera, near the view)"""
+        if not self.active:
+            return
+            
+        # Calculate center position
+        if camera is None:
+            center_x = self.position[0] * GRID_SIZE + GRID_SIZE // 2
+            center_y = self.position[1] * GRID_SIZE + GRID_SIZE // 2
+        elif camera.can_see(self.position, margin=1):  # The sprite spills into the next cells
+            x, y = camera.to_screen(self.position)
+            center_x = x + GRID_SIZE // 2
+            center_y = y + GRID_SIZE // 2
+        else:
+            return
+        
+        # Make the reward pulsate for visual effect
+        pulse = abs(math.sin(app.get_ticks() * 0.01)) * 5
+        sprite = app.atlas.rewards[self.type][round(pulse * 2)]
+        half = SpriteAtlas.REWARD_SIZE // 2
+        surface.blit(sprite, (center_x - half, center_y - half))
+
+class Game(engine.Game):
+    """The headless game with drawable pieces"""
+    snake_class = Snake
+    food_class = Food
+    reward_class = Reward
 
-# Scoreboard functions
-def load_scoreboard():
-    """Load the scoreboard from file"""
+def load_font_cache(path=FONT_CACHE_FILE):
     try:
-        with open(SCOREBOARD_FILE, 'r') as f:
+        with open(path) as f:
             return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Return default scoreboard if file doesn't exist or is invalid
-        return {"high_scores": []}
+    except (OSError, ValueError):
+        return {}
 
-def save_scoreboard(scoreboard):
-    """Save the scoreboard to file"""
-    with open(SCOREBOARD_FILE, 'w') as f:
-        json.dump(scoreboard, f)
+def save_font_cache(cache, path=FONT_CACHE_FILE):
+    try:
+        with open(path, "w") as f:
+            json.dump(cache, f)
+    except OSError:
+        pass  # Only costs a font lookup next time
 
-def add_score_to_scoreboard(name, score):
-    """Add a new score to the scoreboard"""
-    scoreboard = load_scoreboard()
+class SilentSound:
+    """Stands in for the sounds when there is no audio device"""
+    def play(self):
+        pass
+
+class App:
+    """The window, clock and assets of the pygame front end
     
-    # Add new score
-    scoreboard["high_scores"].append({"name": name, "score": score})
+    Importing this module sets nothing up. start() opens the window; fonts,
+    sounds, sprites and the score stores are each created the first time
+    they are used, so a tool that only needs the rules never pays for them.
     
-    # Sort by score (highest first) and keep only top 10
-    scoreboard["high_scores"] = sorted(
-        scoreboard["high_scores"], 
-        key=lambda x: x["score"], 
-        reverse=True
-    )[:10]
+    pygame.font.SysFont scans every installed font (fontconfig on Linux)
+    before it can answer. The path it finds is kept in FONT_CACHE_FILE and
+    later launches open that file directly.
+    """
+    def __init__(self):
+        self.screen = None
+        self.clock = None
+        self.sound_enabled = True
+        self.sounds = {}
+        self.started = time.perf_counter()
     
-    # Save updated scoreboard
-    save_scoreboard(scoreboard)
+    def start(self):
+        """Open the window; later calls do nothing"""
+        if self.screen is not None:
+            return
+        # Only what the first frame needs; the mixer waits for the first sound
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Classic Snake Game")
+        self.clock = pygame.time.Clock()
+        self.started = time.perf_counter()
     
-    # Return position in scoreboard (0-based)
-    for i, entry in enumerate(scoreboard["high_scores"]):
-        if entry["name"] == name and entry["score"] == score:
-            return i
+    def get_ticks(self):
+        """Milliseconds since start(), like pygame.time.get_ticks() (which needs pygame.init())"""
+        return (time.perf_counter() - self.started) * 1000
     
-    return -1  # Not in top 10
-
-def is_high_score(score):
-    """Check if score qualifies for the high score board"""
-    scoreboard = load_scoreboard()
+    @cached_property
+    def font_path(self):
+        """File for FONT_NAME, or None for pygame's default font"""
+        cache = load_font_cache()
+        path = cache.get(FONT_NAME)
+        if path is not None and os.path.exists(path):
+            return path
+        path = pygame.font.match_font(FONT_NAME)
+        # Only a font that was found is kept: a miss (say fontconfig was
+        # missing) is looked up again next launch
+        if path is not None:
+            cache[FONT_NAME] = path
+            save_font_cache(cache)
+        return path
+    
+    @cached_property
+    def font(self):
+        return pygame.font.Font(self.font_path, 25)
     
-    # If we have fewer than 10 scores, any score qualifies
-    if len(scoreboard["high_scores"]) < 10:
-        return True
+    @cached_property
+    def small_font(self):
+        return pygame.font.Font(self.font_path, 20)
     
-    # Otherwise, check if score is higher than the lowest score
-    return score > min(entry["score"] for entry in scoreboard["high_scores"]) if scoreboard["high_scores"] else True
+    @cached_property
+    def large_font(self):
+        return pygame.font.Font(self.font_path, 50)
+    
+    def sound(self, name):
+        """One of SOUNDS, loaded (with the mixer) on first use"""
+        sound = self.sounds.get(name)
+        if sound is None:
+            self.load_sounds()
+            sound = self.sounds[name]
+        return sound
+    
+    def load_sounds(self):
+        if self.sounds:
+            return
+        try:
+            if not mixer.get_init():
+                mixer.init()
+        except pygame.error as error:
+            print(f"No audio ({error}). Playing without sound.")
+            self.sounds = dict.fromkeys(SOUNDS, SilentSound())
+            return
+        try:
+            sounds = {name: mixer.Sound(os.path.join(SOUND_DIR, name + ".wav")) for name in SOUNDS}
+        except (FileNotFoundError, pygame.error):
+            # Create placeholder sounds
+            sounds = {name: mixer.Sound(buffer=bytearray(100)) for name in SOUNDS}
+            print("Sound files not found. Using placeholder sounds.")
+        self.sounds = sounds
+    
+    @cached_property
+    def atlas(self):
+        return SpriteAtlas()
+    
+    @cached_property
+    def scoreboard(self):
+        # High scores, read once and kept in memory
+        return Scoreboard(SCOREBOARD_FILE)
+    
+    @cached_property
+    def leaderboard(self):
+        # Every saved score, for all-time ranks
+        return Leaderboard(LEADERBOARD_FILE)
+    
+    def quit(self):
+        if "scoreboard" in vars(self):
+            # Scores still waiting for their turn to be written
+            self.scoreboard.flush(wait=True)
+        if "leaderboard" in vars(self):
+            self.leaderboard.close()
+        pygame.quit()
+
+app = App()
 
 def draw_scoreboard(surface):
     """Draw the scoreboard on the screen"""
-    scoreboard = load_scoreboard()
     
     # Draw title
-    title_text = large_font.render("HIGH SCORES", True, GOLD)
+    title_text = render_text(app.large_font, "HIGH SCORES", GOLD)
     surface.blit(title_text, (WIDTH//2 - title_text.get_width()//2, 100))
     
     # Draw scores
     y_pos = 170
-    for i, entry in enumerate(scoreboard["high_scores"]):
+    for i, entry in enumerate(app.scoreboard.high_scores):
         # Determine color (gold for top 3, white for others)
         color = GOLD if i < 3 else WHITE
         
         # Format the entry
-        rank_text = font.render(f"{i+1}.", True, color)
-        name_text = font.render(f"{entry['name']}", True, color)
-        score_text = font.render(f"{entry['score']}", True, color)
+        rank_text = render_text(app.font, f"{i+1}.", color)
+        name_text = render_text(app.font, f"{entry['name']}", color)
+        score_text = render_text(app.font, f"{entry['score']}", color)
         
         # Position and draw
         surface.blit(rank_text, (WIDTH//2 - 150, y_pos))
@@ -321,7 +442,7 @@ def draw_scoreboard(surface):
         y_pos += 30
     
     # Draw instruction to return
-    back_text = font.render("Press SPACE to return", True, WHITE)
+    back_text = render_text(app.font, "Press SPACE to return", WHITE)
     surface.blit(back_text, (WIDTH//2 - back_text.get_width()//2, HEIGHT - 50))
 
 def get_player_name(surface, score):
@@ -332,7 +453,7 @@ def get_player_name(surface, score):
     while entering_name:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
+                app.quit()
                 sys.exit()
             
             if event.type == pygame.KEYDOWN:
@@ -347,11 +468,11 @@ def get_player_name(surface, score):
         surface.fill(BLACK)
         
         # Draw title
-        title_text = large_font.render("NEW HIGH SCORE!", True, GOLD)
-        score_text = font.render(f"Your score: {score}", True, WHITE)
-        prompt_text = font.render("Enter your name:", True, WHITE)
-        name_text = font.render(name + "_", True, WHITE)
-        enter_text = font.render("Press ENTER when done", True, WHITE)
+        title_text = render_text(app.large_font, "NEW HIGH SCORE!", GOLD)
+        score_text = render_text(app.font, f"Your score: {score}", WHITE)
+        prompt_text = render_text(app.font, "Enter your name:", WHITE)
+        name_text = render_text(app.font, name + "_", WHITE)
+        enter_text = render_text(app.font, "Press ENTER when done", WHITE)
         
         surface.blit(title_text, (WIDTH//2 - title_text.get_width()//2, 150))
         surface.blit(score_text, (WIDTH//2 - score_text.get_width()//2, 220))
@@ -360,202 +481,647 @@ def get_player_name(surface, score):
         surface.blit(enter_text, (WIDTH//2 - enter_text.get_width()//2, 370))
         
         pygame.display.flip()
-        clock.tick(30)
+        app.clock.tick(30)
     
     return name if name else "Player"
 
-def play_sound(sound):
-    """Play sound if sounds are enabled"""
-    if sound_enabled:
-        sound.play()
+def play_sound(name):
+    """Play a sound if sounds are enabled"""
+    if app.sound_enabled:
+        app.sound(name).play()
 
 def draw_score(surface, score):
-    """Draw score and sound status"""
-    score_text = font.render(f'Score: {score}', True, WHITE)
+    """Draw score and sound status, returning the areas drawn"""
+    score_text = render_text(app.font, f'Score: {score}', WHITE)
     surface.blit(score_text, (10, 10))
+    rects = [score_text.get_rect(topleft=(10, 10))]
     
     # Draw sound status
-    sound_status = "Sound: ON" if sound_enabled else "Sound: OFF"
-    sound_color = GREEN if sound_enabled else RED
-    sound_text = small_font.render(sound_status, True, sound_color)
+    sound_status = "Sound: ON" if app.sound_enabled else "Sound: OFF"
+    sound_color = GREEN if app.sound_enabled else RED
+    sound_text = render_text(app.small_font, sound_status, sound_color)
     surface.blit(sound_text, (WIDTH - sound_text.get_width() - 10, 10))
+    rects.append(sound_text.get_rect(topright=(WIDTH - 10, 10)))
     
     # Draw sound toggle instruction
-    toggle_text = small_font.render("Press 'M' to toggle sound", True, WHITE)
+    toggle_text = render_text(app.small_font, "Press 'M' to toggle sound", WHITE)
     surface.blit(toggle_text, (WIDTH - toggle_text.get_width() - 10, 35))
+    rects.append(toggle_text.get_rect(topright=(WIDTH - 10, 35)))
+    return rects
 
-def draw_game_over(surface, score):
-    game_over_text = large_font.render('GAME OVER', True, WHITE)
-    score_text = font.render(f'Final Score: {score}', True, WHITE)
+def draw_game_over(surface, score, won=False, replay=False, autopilot=False):
+    """The end of a game; a replay or the autopilot's game has no score to save"""
+    game_over_text = render_text(app.large_font, 'YOU WIN!' if won else 'GAME OVER', GOLD if won else WHITE)
+    score_text = render_text(app.font, f'Final Score: {score}', WHITE)
     
     # Check if this is a high score
-    if is_high_score(score):
-        instructions = font.render('Press H to save high score', True, GOLD)
+    high_score = not (replay or autopilot) and app.scoreboard.is_high_score(score)
+    if high_score:
+        instructions = render_text(app.font, 'Press H to save high score', GOLD)
+    elif replay:
+        instructions = render_text(app.font, 'End of replay. Press Q to Quit', WHITE)
     else:
-        instructions = font.render('Press R to Restart or Q to Quit', True, WHITE)
+        instructions = render_text(app.font, 'Press R to Restart or Q to Quit', WHITE)
     
     surface.blit(game_over_text, (WIDTH//2 - game_over_text.get_width()//2, HEIGHT//2 - 70))
     surface.blit(score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT//2 - 10))
     surface.blit(instructions, (WIDTH//2 - instructions.get_width()//2, HEIGHT//2 + 50))
     
     # Always show restart/quit options
-    if is_high_score(score):
-        restart_text = font.render('R: Restart | Q: Quit | S: View Scoreboard', True, WHITE)
+    if high_score:
+        restart_text = render_text(app.font, 'R: Restart | Q: Quit | S: View Scoreboard', WHITE)
         surface.blit(restart_text, (WIDTH//2 - restart_text.get_width()//2, HEIGHT//2 + 90))
 
 def show_reward_notification(surface, points):
-    """Show a temporary notification when a reward is collected"""
-    notification_text = font.render(f"RARE BONUS! +{points} points!", True, GOLD)
+    """Show a temporary notification when a reward is collected, returning the areas drawn"""
+    notification_text = render_text(app.font, f"RARE BONUS! +{points} points!", GOLD)
     surface.blit(notification_text, (WIDTH//2 - notification_text.get_width()//2, 50))
+    rects = [notification_text.get_rect(topleft=(WIDTH//2 - notification_text.get_width()//2, 50))]
     
     # Add a second line for the growth bonus
-    growth_text = small_font.render("Snake grew longer!", True, GREEN)
+    growth_text = render_text(app.small_font, "Snake grew longer!", GREEN)
     surface.blit(growth_text, (WIDTH//2 - growth_text.get_width()//2, 80))
+    rects.append(growth_text.get_rect(topleft=(WIDTH//2 - growth_text.get_width()//2, 80)))
+    return rects
+
+class DirtyRenderer:
+    """Draws the playing field, pushing only what changed to the display
+    
+    A full redraw happens after anything that changes the whole screen
+    (restart, pause, game over, the scoreboard, a notification appearing).
+    In between, each tick only touches a few cells: the new head, the old
+    head, the cell the tail left, the food and the reward. Those areas are
+    cleared and redrawn with a clip rect, and only they are sent to
+    display.update(), so frame cost no longer grows with snake length.
+    
+    Frames are drawn more often than the game ticks. In between, alpha
+    (0 to 1, how far we are into the next tick) slides the head from the
+    cell it left into its new one and the tail out of the cell it gave up,
+    so the picture moves from the previous tick to the current one.
+    """
+    def __init__(self, surface, game):
+        self.surface = surface
+        self.game = game
+        self.full = True
+        self.dirty = []
+        self.overlay_rects = []  # HUD and notification text drawn over the board
+        self.notification = False  # Points shown in the reward notification, if any
+        self.reward_area = None  # Where the reward was last drawn
+        self.food_position = None
+        self.sliding = None  # (head from, tail from, tail to) for the last tick
+        self.sliding_area = []  # Where the moving head and tail were last drawn
+        self.alpha = 1.0
+        self.layers = []  # Callables drawing over everything else, returning the rects they drew
+        self.layer_area = []
+        self.camera = None  # The board fits the window
+        self.replay = False  # Showing a saved game, whose score can't be saved again
+        self.autopilot = False  # The bot is playing, and its scores aren't saved
+    
+    def invalidate(self):
+        """Redraw the whole screen on the next frame"""
+        self.full = True
+    
+    def reset(self):
+        """Forget the last tick, for a game that was just restarted"""
+        self.sliding = None
+        self.invalidate()
+    
+    def cell_rect(self, position):
+        # Food glow spills a pixel past its cell
+        return pygame.Rect(position[0] * GRID_SIZE, position[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE).inflate(4, 4)
+    
+    def reward_rect(self, position):
+        # The pulsing star, its glow and the points label fit in the 3x3 cells around it
+        return pygame.Rect((position[0] - 1) * GRID_SIZE, (position[1] - 1) * GRID_SIZE, GRID_SIZE * 3, GRID_SIZE * 3)
+    
+    def note_tick(self):
+        """Record the cells changed by the game tick that just ran"""
+        game = self.game
+        snake = game.snake
+        if game.game_over:
+            self.invalidate()
+            return
+        
+        positions = snake.positions
+        self.dirty.append(self.cell_rect(positions[0]))
+        neck = positions[1] if len(positions) > 1 else None
+        if neck is not None:
+            self.dirty.append(self.cell_rect(neck))  # The old head is body now
+        if snake.last_tail is not None:
+            self.dirty.append(self.cell_rect(snake.last_tail))
+        if neck is not None:
+            tail = positions[-1] if snake.last_tail is not None else None
+            self.sliding = (neck, snake.last_tail, tail)
+        if game.food.position != self.food_position:
+            self.dirty.append(self.cell_rect(game.food.position))
+            if self.food_position is not None:
+                self.dirty.append(self.cell_rect(self.food_position))
+            self.food_position = game.food.position
+        if game.ate_food or game.reward_collected:
+            # The score text sits in the top left corner
+            self.dirty.append(pygame.Rect(0, 0, WIDTH // 2, 45))
+    
+    def draw(self, game_over, paused, notification_timer, reward_points, alpha=1.0):
+        self.alpha = alpha
+        notification = reward_points if notification_timer > 0 else False
+        if notification != self.notification:
+            self.notification = notification
+            self.full = True
+        
+        if self.full or game_over or paused:
+            self.draw_full(game_over, paused, reward_points)
+            self.layer_area = self.draw_layers()
+            pygame.display.flip()
+            return
+        
+        # The reward pulses every frame, and leaves a hole when it goes
+        reward = self.game.reward
+        if self.reward_area is not None:
+            self.dirty.append(self.reward_area)
+        self.reward_area = self.reward_rect(reward.position) if reward.active else None
+        if self.reward_area is not None:
+            self.dirty.append(self.reward_area)
+        
+        # The moving head and tail, where they are now and where they were last frame
+        sliding_rects = self.sliding_rects()
+        self.dirty += self.sliding_area
+        self.dirty += sliding_rects
+        self.sliding_area = sliding_rects
+        self.dirty += self.layer_area
+        
+        rects = [rect.clip(self.surface.get_rect()) for rect in self.dirty]
+        self.dirty = []
+        for rect in rects:
+            self.redraw(rect, reward_points)
+        self.layer_area = self.draw_layers()
+        pygame.display.update(rects + self.layer_area)
+    
+    def draw_layers(self):
+        rects = []
+        for layer in self.layers:
+            rects += layer(self.surface)
+        return rects
+    
+    def draw_full(self, game_over, paused, reward_points):
+        game = self.game
+        surface = self.surface
+        self.draw_background()
+        
+        # Draw everything
+        self.draw_snake()
+        game.food.render(surface, self.camera)
+        if game.reward.active:
+            game.reward.render(surface, self.camera)
+        self.overlay_rects = draw_score(surface, game.snake.score)
+        
+        # Show reward notification if timer is active
+        if self.notification:
+            self.overlay_rects += show_reward_notification(surface, reward_points)
+        
+        if game_over:
+            draw_game_over(surface, game.snake.score, game.won, self.replay, self.autopilot)
+        
+        if paused:
+            pause_text = render_text(app.large_font, 'PAUSED', WHITE)
+            surface.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2))
+            
+            # Show scoreboard option during pause
+            view_scores_text = render_text(app.font, "Press S to view high scores", WHITE)
+            surface.blit(view_scores_text, (WIDTH//2 - view_scores_text.get_width()//2, HEIGHT//2 + 60))
+        
+        self.full = False
+        self.dirty = []
+        self.food_position = game.food.position
+        self.reward_area = self.reward_rect(game.reward.position) if game.reward.active else None
+        self.sliding_area = self.sliding_rects()
+    
+    def draw_background(self):
+        self.surface.fill(BLACK)
+    
+    def sliding_rects(self):
+        """The areas the moving head and tail cover until the tick ends"""
+        if self.sliding is None or self.alpha >= 1:
+            return []
+        head_from, tail_from, tail_to = self.sliding
+        rects = [self.cell_rect(head_from).union(self.cell_rect(self.game.snake.get_head_position()))]
+        if tail_from is not None:
+            rects.append(self.cell_rect(tail_from).union(self.cell_rect(tail_to)))
+        return rects
+    
+    def redraw(self, rect, reward_points):
+        """Repaint one area of the board, in the same order as draw_full"""
+        game = self.game
+        snake = game.snake
+        surface = self.surface
+        surface.set_clip(rect)
+        surface.fill(BLACK)
+        
+        self.draw_snake(rect)
+        if rect.colliderect(self.cell_rect(game.food.position)):
+            game.food.render(surface)
+        if game.reward.active and rect.colliderect(self.reward_rect(game.reward.position)):
+            game.reward.render(surface)
+        if rect.collidelist(self.overlay_rects) != -1:
+            self.overlay_rects = draw_score(surface, snake.score)
+            if self.notification:
+                self.overlay_rects += show_reward_notification(surface, reward_points)
+        
+        surface.set_clip(None)
+    
+    def draw_snake(self, rect=None):
+        """Draw the snake, or just the cells of it inside rect, at the current alpha"""
+        snake = self.game.snake
+        surface = self.surface
+        sliding = self.sliding if self.alpha < 1 else None
+        head = snake.get_head_position()
+        if rect is None:
+            snake.render(surface, head=sliding is None, camera=self.camera)
+        else:
+            for y in range(rect.top // GRID_SIZE, min((rect.bottom - 1) // GRID_SIZE + 1, GRID_HEIGHT)):
+                for x in range(rect.left // GRID_SIZE, min((rect.right - 1) // GRID_SIZE + 1, GRID_WIDTH)):
+                    if snake.is_occupied((x, y)) and not (sliding and (x, y) == head):
+                        snake.render_segment(surface, (x, y), (x, y) == head)
+        
+        if sliding is not None:
+            head_from, tail_from, tail_to = sliding
+            alpha = self.alpha
+            if tail_from is not None:
+                snake.render_segment(surface, (tail_from[0] + (tail_to[0] - tail_from[0]) * alpha,
+                                               tail_from[1] + (tail_to[1] - tail_from[1]) * alpha), False, self.camera)
+            snake.render_segment(surface, self.head_position(), True, self.camera)
+    
+    def head_position(self):
+        """Where the head is drawn this frame, between cells while it moves"""
+        head = self.game.snake.get_head_position()
+        if self.sliding is None or self.alpha >= 1:
+            return head
+        head_from = self.sliding[0]
+        return (head_from[0] + (head[0] - head_from[0]) * self.alpha,
+                head_from[1] + (head[1] - head_from[1]) * self.alpha)
+
+class CameraRenderer(DirtyRenderer):
+    """Draws a board that doesn't fit the window, through a camera on the head
+    
+    The view scrolls every frame, so every frame is redrawn, but only the
+    cells on screen are visited: the cost depends on the window, not on
+    the size of the board or the snake. Food and rewards out of view are
+    marked at the edge of the window, in the direction to find them.
+    """
+    MARKER_RADIUS = 6
+    
+    def __init__(self, surface, game):
+        super().__init__(surface, game)
+        self.camera = Camera(game.grid_width, game.grid_height)
+    
+    def note_tick(self):
+        super().note_tick()
+        self.dirty = []
+    
+    def draw(self, game_over, paused, notification_timer, reward_points, alpha=1.0):
+        self.alpha = alpha
+        self.notification = reward_points if notification_timer > 0 else False
+        self.camera.follow(self.head_position())
+        self.draw_full(game_over, paused, reward_points)
+        self.layer_area = self.draw_layers()
+        pygame.display.flip()
+    
+    def draw_background(self):
+        surface = self.surface
+        surface.fill(BLACK)
+        # The walls, wherever they are in view
+        x, y = self.camera.to_screen((0, 0))
+        board = pygame.Rect(x, y, self.game.grid_width * GRID_SIZE, self.game.grid_height * GRID_SIZE)
+        pygame.draw.rect(surface, DARK_GRAY, board.inflate(4, 4), 2)
+        
+        game = self.game
+        self.draw_marker(game.food.position, RED)
+        if game.reward.active:
+            self.draw_marker(game.reward.position, game.reward.color)
+    
+    def draw_marker(self, position, color):
+        """Point at a cell that is out of view from the nearest edge of the window"""
+        if self.camera.can_see(position):
+            return
+        x, y = self.camera.to_screen(position)
+        margin = self.MARKER_RADIUS + 2
+        x = min(max(x + GRID_SIZE // 2, margin), WIDTH - margin)
+        y = min(max(y + GRID_SIZE // 2, margin), HEIGHT - margin)
+        pygame.draw.circle(self.surface, color, (x, y), self.MARKER_RADIUS)
+
+def make_renderer(surface, game):
+    """The cheapest renderer that can show the game's board"""
+    if (game.grid_width, game.grid_height) == (GRID_WIDTH, GRID_HEIGHT):
+        return DirtyRenderer(surface, game)
+    return CameraRenderer(surface, game)
+
+class ProfilerOverlay:
+    """Rolling p50/p95/p99 of each profiled section, in the bottom left corner
+    
+    The numbers change every frame, so they are rendered straight from the
+    font (not through text_cache) and only every REFRESH_FRAMES frames.
+    """
+    REFRESH_FRAMES = 15
+    
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.lines = []
+        self.refreshed = None
+    
+    def refresh(self):
+        profiler = self.profiler
+        self.refreshed = profiler.frames
+        self.lines = [app.small_font.render("ms          p50    p95    p99", True, WHITE)]
+        for name in ("frame",) + profiler.sections:
+            values = profiler.percentiles(name)
+            if values is not None:
+                text = f"{name:<16}" + "".join(f"{value:7.2f}" for value in values)
+                self.lines.append(app.small_font.render(text, True, YELLOW))
+    
+    def __call__(self, surface):
+        profiler = self.profiler
+        if not profiler.enabled:
+            return []
+        if self.refreshed is None or profiler.frames - self.refreshed >= self.REFRESH_FRAMES:
+            self.refresh()
+        
+        line_height = app.small_font.get_linesize()
+        width = max(line.get_width() for line in self.lines) + 10
+        area = pygame.Rect(0, HEIGHT - line_height * len(self.lines) - 10, width, line_height * len(self.lines) + 10)
+        surface.fill(BLACK, area)
+        for i, line in enumerate(self.lines):
+            surface.blit(line, (area.left + 5, area.top + 5 + i * line_height))
+        return [area]
+
+class AutopilotBanner:
+    """Tells whoever walks up that the game is playing itself, in the top right corner"""
+    def __init__(self):
+        self.active = True
+    
+    def __call__(self, surface):
+        if not self.active:
+            return []
+        text = render_text(app.small_font, "Autopilot - press an arrow key to play", YELLOW)
+        area = text.get_rect(topright=(WIDTH - 10, 10))
+        surface.blit(text, area)
+        return [area]
+
+def save_replay(recorder):
+    """Save a finished game under REPLAY_DIR"""
+    if not os.path.exists(REPLAY_DIR):
+        os.makedirs(REPLAY_DIR)
+    name = time.strftime("%Y%m%d-%H%M%S") + f"-{recorder.seed:016x}.snkr"
+    recorder.save(os.path.join(REPLAY_DIR, name))
+
+def play_replay(path, speed=1.0):
+    """Watch a saved game; speed scales the game's own tick rate"""
+    app.start()
+    with Replay(path) as replay:
+        game = replay.new_game(Game)
+        renderer = make_renderer(app.screen, game)
+        renderer.replay = True
+        running = True
+        game_over = False
+        
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key in (pygame.K_q, pygame.K_ESCAPE):
+                    running = False
+            
+            if not game_over and (game.ticks >= replay.ticks or not replay.step(game)):
+                game_over = True
+            renderer.note_tick()
+            renderer.draw(game_over, False, 0, 0)
+            app.clock.tick(game.snake.speed * speed if not game_over else 30)
+    
+    app.quit()
+    sys.exit()
 
-def main():
-    global sound_enabled
+def print_input_latency(game):
+    """Report how long turns waited between the key press and the move"""
+    summary = game.turns.latency_summary()
+    if summary is None:
+        print("Input latency: no turns made", file=sys.stderr)
+        return
+    print(f"Input latency over {summary['samples']} turns (key press to move):", file=sys.stderr)
+    for name in ("p50", "p95", "max"):
+        ticks, millis = summary[name]
+        print(f"  {name}: {ticks} ticks, {millis:.1f} ms", file=sys.stderr)
+
+def instrument(profiler, game, renderer):
+    """Hook the profiler up to the parts of a frame worth timing"""
+    module = sys.modules[__name__]
+    profiler.instrument(game.snake, "update", "update")
+    profiler.instrument(game.food, "randomize_position", "spawn")
+    profiler.instrument(game.reward, "activate", "spawn")
+    profiler.instrument(renderer, "draw_snake", "Snake.render")
+    profiler.instrument(game.reward, "render", "Reward.render")
+    profiler.instrument(module, "draw_score", "draw_score")
+    profiler.instrument(module, "draw_scoreboard", "draw_scoreboard")
+    profiler.instrument(pygame.display, "flip", "display.flip")
+    profiler.instrument(pygame.display, "update", "display.flip")
+
+def main(show_latency=False, profile=False, profile_csv=None, show_startup=False, board=None, autopilot=False):
+    app.start()
+    width, height = board or (GRID_WIDTH, GRID_HEIGHT)
+    game = Game(width, height, packed=width * height >= PACKED_BODY_CELLS)
+    snake = game.snake
+    renderer = make_renderer(app.screen, game)
+    recorder = Recorder(game)
+    
+    # Frame timings, shown with F3
+    profiler = Profiler()
+    instrument(profiler, game, renderer)
+    renderer.layers.append(ProfilerOverlay(profiler))
+    if profile_csv:
+        profiler.export(profile_csv)
+    if profile or profile_csv:
+        profiler.start()
     
-    snake = Snake()
-    food = Food()
-    reward = Reward()
+    # Attract mode: the bot plays until someone presses an arrow key
+    pilot = Autopilot(game) if autopilot else None
+    banner = AutopilotBanner()
+    banner.active = renderer.autopilot = pilot is not None
+    renderer.layers.append(banner)
+    restart_at = None
     
     running = True
     game_over = False
     paused = False
     viewing_scoreboard = False
     
-    # Variables for reward spawning
-    reward_chance = 0.0005  # 0.05% chance per frame to spawn a reward (10x more rare)
+    # Variables for the reward notification
     reward_notification_timer = 0
     reward_points = 0
     
+    # Milliseconds of game time not yet simulated
+    accumulator = 0.0
+    frame_time = 0
+    first_frame = True
+    
     while running:
+        profiler.start_frame()
+        profiler.begin("events")
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             
             # Handle key presses
             if event.type == pygame.KEYDOWN:
-                if viewing_scoreboard:
+                if event.key not in (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT):
+                    # Anything else may change what's on screen
+                    renderer.invalidate()
+                elif pilot is not None:
+                    # A player takes over from here
+                    pilot = None
+                    banner.active = renderer.autopilot = False
+                    restart_at = None
+                
+                if event.key == pygame.K_F3:
+                    profiler.toggle()
+                elif viewing_scoreboard:
                     if event.key == pygame.K_SPACE:
                         viewing_scoreboard = False
                 elif game_over:
                     if event.key == pygame.K_r:
                         # Restart game
-                        snake.reset()
-                        food.randomize_position()
-                        reward.active = False
+                        game.reset()
+                        recorder.start()
+                        renderer.reset()
                         game_over = False
                         reward_notification_timer = 0
+                        accumulator = 0.0
                     elif event.key == pygame.K_q:
                         running = False
-                    elif event.key == pygame.K_h and is_high_score(snake.score):
+                    elif event.key == pygame.K_h and pilot is None and app.scoreboard.is_high_score(snake.score):
                         # Enter high score
-                        player_name = get_player_name(screen, snake.score)
-                        add_score_to_scoreboard(player_name, snake.score)
+                        player_name = get_player_name(app.screen, snake.score)
+                        app.scoreboard.add(player_name, snake.score)
+                        app.leaderboard.submit(player_name, snake.score)
                         viewing_scoreboard = True
                     elif event.key == pygame.K_s:
                         # View scoreboard
                         viewing_scoreboard = True
                 else:
                     if event.key == pygame.K_UP:
-                        snake.change_direction(UP)
+                        game.queue_turn(UP)
                     elif event.key == pygame.K_DOWN:
-                        snake.change_direction(DOWN)
+                        game.queue_turn(DOWN)
                     elif event.key == pygame.K_LEFT:
-                        snake.change_direction(LEFT)
+                        game.queue_turn(LEFT)
                     elif event.key == pygame.K_RIGHT:
-                        snake.change_direction(RIGHT)
+                        game.queue_turn(RIGHT)
                     elif event.key == pygame.K_SPACE:
                         paused = not paused
                     elif event.key == pygame.K_m:
                         # Toggle sound
-                        sound_enabled = not sound_enabled
+                        app.sound_enabled = not app.sound_enabled
                     elif event.key == pygame.K_s:
                         # View scoreboard during gameplay
                         paused = True
                         viewing_scoreboard = True
+        profiler.end("events")
         
-        # Clear screen
-        screen.fill(BLACK)
+        if game_over and restart_at is not None and app.get_ticks() >= restart_at:
+            # The autopilot starts another game, as if R had been pressed
+            restart_at = None
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r))
         
         if viewing_scoreboard:
-            draw_scoreboard(screen)
+            app.screen.fill(BLACK)
+            draw_scoreboard(app.screen)
+            renderer.draw_layers()
+            pygame.display.flip()
+            renderer.invalidate()
         else:
+            alpha = 1.0
             if not game_over and not paused:
-                # Update snake position
-                if not snake.update():
-                    game_over = True
-                    play_sound(game_over_sound)
-                
-                # Check if snake ate food
-                if snake.get_head_position() == food.position:
-                    snake.length += 1
-                    snake.score += 10
-                    play_sound(eat_sound)
+                # Run as many fixed-length game ticks as the elapsed time covers
+                accumulator += frame_time
+                ticks_run = 0
+                while not game_over and accumulator >= 1000.0 / snake.speed:
+                    accumulator -= 1000.0 / snake.speed
+                    ticks_run += 1
+                    if ticks_run == MAX_TICKS_PER_FRAME:
+                        accumulator = 0.0
                     
-                    # Increase speed every 50 points
-                    if snake.score % 50 == 0:
-                        snake.speed += 1
+                    # Makes the next queued turn, if any
+                    if not recorder.step(pilot() if pilot is not None else None):
+                        game_over = True
+                        play_sound("game_over")
+                        if pilot is not None:
+                            restart_at = app.get_ticks() + AUTOPILOT_RESTART_DELAY
+                        else:
+                            save_replay(recorder)
+                    renderer.note_tick()
                     
-                    # Spawn new food (ensure it's not on the snake)
-                    while True:
-                        food.randomize_position()
-                        if food.position not in snake.positions:
-                            break
-                
-                # Check if snake ate a reward
-                if reward.active and snake.get_head_position() == reward.position:
-                    snake.score += reward.points
-                    reward_points = reward.points
-                    reward_notification_timer = 90  # Show notification for 90 frames (increased from 60)
-                    play_sound(reward_sound)
-                    reward.active = False
+                    if game.ate_food:
+                        play_sound("eat")
                     
-                    # Bonus: Add a segment to the snake when collecting a reward
-                    snake.length += 1
-                
-                # Update reward
-                reward.update()
-                
-                # Random chance to spawn a reward if none is active
-                if not reward.active and random.random() < reward_chance:
-                    reward.activate(snake.positions)
+                    if game.reward_collected:
+                        reward_points = game.reward_collected
+                        reward_notification_timer = 90  # Show notification for 90 ticks (increased from 60)
+                        play_sound("reward")
+                    
+                    # Update reward notification timer
+                    if reward_notification_timer > 0:
+                        reward_notification_timer -= 1
                 
-                # Update reward notification timer
-                if reward_notification_timer > 0:
-                    reward_notification_timer -= 1
+                # How far into the next tick this frame is drawn
+                if not game_over:
+                    alpha = min(accumulator * snake.speed / 1000.0, 1.0)
             
-            # Draw everything
-            snake.render(screen)
-            food.render(screen)
-            if reward.active:
-                reward.render(screen)
-            draw_score(screen, snake.score)
-            
-            # Show reward notification if timer is active
-            if reward_notification_timer > 0:
-                show_reward_notification(screen, reward_points)
-            
-            if game_over:
-                draw_game_over(screen, snake.score)
-            
-            if paused and not viewing_scoreboard:
-                pause_text = large_font.render('PAUSED', True, WHITE)
-                screen.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2))
-                
-                # Show scoreboard option during pause
-                view_scores_text = font.render("Press S to view high scores", True, WHITE)
-                screen.blit(view_scores_text, (WIDTH//2 - view_scores_text.get_width()//2, HEIGHT//2 + 60))
+            # Draw whatever changed
+            renderer.draw(game_over, paused, reward_notification_timer, reward_points, alpha)
         
-        # Update display
-        pygame.display.flip()
+        if first_frame:
+            # The window is up; now load what the first frame didn't need
+            first_frame = False
+            if show_startup:
+                print(f"Time to first frame: {(time.perf_counter() - STARTED) * 1000:.0f} ms", file=sys.stderr)
+            app.load_sounds()
         
-        # Control game speed
-        clock.tick(snake.speed if not (game_over or paused or viewing_scoreboard) else 30)
+        # Write any new high score out between frames (unless another game is writing)
+        app.scoreboard.flush()
+        profiler.end_frame()
+        
+        # Draw at display rate while playing; the menus can idle
+        frame_time = app.clock.tick(RENDER_FPS if not (game_over or paused or viewing_scoreboard) else 30)
     
-    pygame.quit()
+    if show_latency:
+        print_input_latency(game)
+    profiler.stop()
+    profiler.close()
+    app.quit()
     sys.exit()
 
+def board_size(text):
+    """Parse a WIDTHxHEIGHT board size"""
+    try:
+        width, height = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    if not (4 <= width <= MAX_BOARD_SIDE and 4 <= height <= MAX_BOARD_SIDE):
+        raise argparse.ArgumentTypeError(f"board sides must be between 4 and {MAX_BOARD_SIDE} cells")
+    return width, height
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Classic Snake Game")
+    parser.add_argument("--replay", metavar="FILE", help="watch a saved replay instead of playing")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    parser.add_argument("--input-latency", action="store_true",
+                        help="print key press to move latency when the game closes")
+    parser.add_argument("--profile", action="store_true", help="start with the profiler overlay on (F3 toggles it)")
+    parser.add_argument("--profile-csv", metavar="FILE", help="write per-frame profiler timings to a CSV file")
+    parser.add_argument("--startup-time", action="store_true", help="print the time from launch to the first frame")
+    parser.add_argument("--board", type=board_size, metavar="WxH",
+                        help=f"board size in cells (default {GRID_WIDTH}x{GRID_HEIGHT}); bigger boards scroll")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="attract mode: the game plays itself until an arrow key is pressed")
+    args = parser.parse_args()
+    
+    if args.replay:
+        play_replay(args.replay, args.speed)
+    else:
+        main(args.input_latency, args.profile, args.profile_csv, args.startup_time, args.board, args.autopilot)
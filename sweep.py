@@ -0,0 +1,329 @@
+"""Sweep the game's tuning knobs and compare how the games turn out.
+
+Plays headless games under every combination of the knob values given (or
+a --sample of them picked at random) and prints one row per configuration:
+score, ticks survived and rewards collected, as means and 10th, 50th and
+90th percentiles. Knobs left out keep the game's values.
+
+Games are played by the rollout bot, or with --replays by the moves in
+saved replays. Replayed moves are played blind, so they stay a fair player
+only for knobs that don't move the food (reward chance and duration change
+how the random generator is drawn from; points and speed don't). Bots
+don't feel the snake's speed either, so fps and speed_up_every only change
+"seconds", how long a game would last in real time.
+
+Every configuration plays the same episodes, in batches spread across all
+cores. It stops early once its mean score and mean ticks are both known
+to within --tolerance (half the 95% confidence interval, relative to the
+mean). Stopping is decided on the batches in order, so the results don't
+depend on how many workers there were.
+
+    python sweep.py --reward-chance 0.0005 0.002 0.01 --reward-duration 75 150 300
+    python sweep.py --reward-points 50,100,200 100,200,400 --fps 6 8 10 --sample 5
+    python sweep.py --reward-points 25,50,100 50,100,200 --replays replays/
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import queue
+import random
+import statistics
+import sys
+import time
+from collections import deque
+
+import engine
+from replay import NO_TURN, Replay, replay_paths
+from rollout import episode_seeds, greedy_policy
+
+BATCH_SIZE = 50  # Episodes a worker plays per task
+MIN_BATCHES = 2  # Batches a configuration plays before it may stop early
+Z_95 = 1.96  # Standard errors in half a 95% confidence interval
+
+
+def reward_points(text):
+    """Parse reward points per type, like 50,100,200"""
+    try:
+        points = tuple(int(part) for part in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated points, got {text!r}")
+    if len(points) != len(engine.REWARD_POINTS):
+        raise argparse.ArgumentTypeError(f"expected {len(engine.REWARD_POINTS)} reward types, got {text!r}")
+    return points
+
+
+# name: (default, parser)
+KNOBS = {
+    "reward_chance": (engine.REWARD_CHANCE, float),
+    "reward_duration": (engine.REWARD_DURATION, int),
+    "reward_points": (engine.REWARD_POINTS, reward_points),
+    "speed_up_every": (engine.SPEED_UP_EVERY, int),
+    "fps": (engine.FPS, int),
+}
+
+
+def configure(game, config):
+    """Apply a configuration to a freshly reset game"""
+    game.reward_chance = config["reward_chance"]
+    game.reward.duration = config["reward_duration"]
+    game.reward.point_values = config["reward_points"]
+    game.speed_up_every = config["speed_up_every"]
+    game.snake.speed = config["fps"]
+
+
+def play(game, policy, max_ticks):
+    """Play a configured game to the end; return its result as a dict"""
+    seconds = 0.0
+    rewards = 0
+    reward_score = 0
+    while game.ticks < max_ticks:
+        seconds += 1 / game.snake.speed
+        alive = game.step(policy(game))
+        if game.reward_collected:
+            rewards += 1
+            reward_score += game.reward_collected
+        if not alive:
+            break
+
+    if game.won:
+        cause = "won"
+    elif game.game_over:
+        cause = game.death_cause
+    else:
+        cause = "timeout"
+    return {"score": game.snake.score, "ticks": game.ticks, "seconds": seconds,
+            "rewards": rewards, "reward_score": reward_score, "cause": cause}
+
+
+def play_batch(config, episodes, grid_width, grid_height, max_ticks):
+    """Play a batch of episodes, each a seed for the bot or a replay path"""
+    results = []
+    for episode in episodes:
+        if isinstance(episode, str):
+            with Replay(episode) as replay:
+                game = replay.new_game()
+                configure(game, config)
+                inputs = replay.inputs
+
+                def recorded(game):
+                    code = inputs[game.ticks]
+                    return engine.DIRECTIONS[code - 1] if code != NO_TURN else None
+
+                # A game that outlives its recorded moves ends as a timeout
+                results.append(play(game, recorded, min(max_ticks, replay.ticks)))
+        else:
+            game = engine.Game(grid_width, grid_height, seed=episode)
+            configure(game, config)
+            results.append(play(game, greedy_policy, max_ticks))
+    return results
+
+
+def percentile(values, fraction):
+    """A percentile of sorted values"""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Results:
+    """The episodes of one configuration, taken in batch order"""
+    def __init__(self, config):
+        self.config = config
+        self.episodes = []
+        self.arrived = {}  # Batch index -> results, waiting for the batches before it
+        self.batches = 0  # Batches taken so far
+        self.converged = False
+
+    def add(self, index, results, tolerance):
+        """Take a finished batch; return True once no more are needed"""
+        self.arrived[index] = results
+        while self.batches in self.arrived and not self.converged:
+            self.episodes += self.arrived.pop(self.batches)
+            self.batches += 1
+            if self.batches >= MIN_BATCHES:
+                self.converged = all(self.half_width(name) <= tolerance * abs(self.mean(name))
+                                     for name in ("score", "ticks"))
+        return self.converged
+
+    def mean(self, name):
+        return statistics.fmean(episode[name] for episode in self.episodes)
+
+    def half_width(self, name):
+        """Half the 95% confidence interval of the mean"""
+        values = [episode[name] for episode in self.episodes]
+        return Z_95 * statistics.stdev(values) / math.sqrt(len(values)) if len(values) > 1 else math.inf
+
+    def summary(self):
+        summary = {"config": {name: list(value) if isinstance(value, tuple) else value
+                              for name, value in self.config.items()},
+                   "episodes": len(self.episodes), "converged": self.converged}
+        for name in ("score", "ticks", "seconds", "rewards"):
+            values = sorted(episode[name] for episode in self.episodes)
+            summary[name] = {"mean": statistics.fmean(values), "ci95": self.half_width(name),
+                             "p10": percentile(values, 0.1), "p50": percentile(values, 0.5),
+                             "p90": percentile(values, 0.9)}
+        total = sum(episode["score"] for episode in self.episodes)
+        summary["reward_share"] = sum(episode["reward_score"] for episode in self.episodes) / total if total else 0.0
+        causes = {}
+        for episode in self.episodes:
+            causes[episode["cause"]] = causes.get(episode["cause"], 0) + 1
+        summary["causes"] = causes
+        return summary
+
+
+def sweep(configs, episodes, batch_size=BATCH_SIZE, tolerance=0.05, processes=None,
+          grid_width=engine.GRID_WIDTH, grid_height=engine.GRID_HEIGHT, max_ticks=100000,
+          progress=None):
+    """Play the episodes under every configuration; return a Results per configuration
+
+    Batches go out round-robin across the configurations still running, a
+    few per worker at a time. progress(results) is called as each
+    configuration finishes. processes=1 plays everything in this process.
+    """
+    if not episodes:
+        raise ValueError("no episodes to play")
+    batches = [episodes[i:i + batch_size] for i in range(0, len(episodes), batch_size)]
+    everything = [Results(config) for config in configs]
+    scheduled = [0] * len(configs)  # Batches handed out per configuration
+    running = deque(range(len(configs)))
+    finished = queue.SimpleQueue()
+    in_flight = 0
+    done = 0
+
+    pool = None
+    if processes != 1:
+        processes = processes or multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(processes)
+    try:
+        while done < len(configs):
+            # Keep every worker busy, taking turns among the configurations
+            while running and in_flight < (processes * 2 if pool else 1):
+                i = running.popleft()
+                if everything[i].converged or scheduled[i] == len(batches):
+                    continue
+                index = scheduled[i]
+                scheduled[i] += 1
+                args = (configs[i], batches[index], grid_width, grid_height, max_ticks)
+                if pool:
+                    pool.apply_async(play_batch, args,
+                                     callback=lambda results, i=i, index=index: finished.put((i, index, results)),
+                                     error_callback=lambda error: finished.put(error))
+                else:
+                    finished.put((i, index, play_batch(*args)))
+                in_flight += 1
+                running.append(i)
+
+            item = finished.get()
+            if isinstance(item, BaseException):
+                raise item
+            i, index, results = item
+            in_flight -= 1
+            was_done = everything[i].converged or everything[i].batches == len(batches)
+            everything[i].add(index, results, tolerance)
+            if not was_done and (everything[i].converged or everything[i].batches == len(batches)):
+                done += 1
+                if progress:
+                    progress(everything[i])
+    finally:
+        if pool:
+            pool.terminate()
+    return everything
+
+
+def grid(values):
+    """Every combination of the knob values, as config dicts"""
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+
+def describe(value):
+    return ",".join(map(str, value)) if isinstance(value, tuple) else str(value)
+
+
+def print_table(everything, varying):
+    """One row per configuration, best mean score first"""
+    headers = [name for name in varying]
+    rows = []
+    for results in sorted(everything, key=lambda results: -results.mean("score")):
+        summary = results.summary()
+        score = summary["score"]
+        ticks = summary["ticks"]
+        rows.append([describe(results.config[name]) for name in varying] + [
+            f"{summary['episodes']}{'' if summary['converged'] else '*'}",
+            f"{score['mean']:.1f} ± {score['ci95']:.1f}",
+            f"{score['p10']}/{score['p50']}/{score['p90']}",
+            f"{ticks['mean']:.0f}",
+            f"{ticks['p10']}/{ticks['p50']}/{ticks['p90']}",
+            f"{summary['seconds']['mean']:.1f}",
+            f"{summary['rewards']['mean']:.2f}",
+            f"{summary['reward_share']:.0%}",
+        ])
+    headers += ["games", "score", "score p10/50/90", "ticks", "ticks p10/50/90", "seconds",
+                "rewards", "from rewards"]
+    widths = [max(len(header), *(len(row[i]) for row in rows)) for i, header in enumerate(headers)]
+    print("  ".join(header.rjust(width) for header, width in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for name, (default, parse) in KNOBS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=parse, nargs="+", default=[default],
+                            metavar="VALUE", help=f"values to try (default {describe(default)})")
+    parser.add_argument("--sample", type=int, default=None,
+                        help="try this many combinations at random instead of all of them")
+    parser.add_argument("--episodes", type=int, default=2000, help="most episodes per configuration")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="stop once the 95%% confidence intervals are within this share of the means")
+    parser.add_argument("--replays", metavar="PATH", help="replay the moves in these replays instead of the bot")
+    parser.add_argument("--board", default=f"{engine.GRID_WIDTH}x{engine.GRID_HEIGHT}", help="WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=0, help="master seed for the episodes and --sample")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--max-ticks", type=int, default=100000)
+    parser.add_argument("--jsonl", action="store_true", help="print every configuration's summary as a JSON line")
+    args = parser.parse_args()
+    width, height = (int(part) for part in args.board.lower().split("x"))
+
+    values = {name: getattr(args, name) for name in KNOBS}
+    configs = grid(values)
+    if args.sample is not None and args.sample < len(configs):
+        configs = random.Random(args.seed).sample(configs, args.sample)
+    varying = [name for name in KNOBS if len(values[name]) > 1]
+    if args.replays:
+        episodes = replay_paths(args.replays)[:args.episodes]
+        if not episodes:
+            print(f"No replays found in {args.replays}", file=sys.stderr)
+            return 1
+    else:
+        episodes = episode_seeds(args.seed, args.episodes)
+
+    start = time.perf_counter()
+
+    def progress(results):
+        state = "converged" if results.converged else "ran out of episodes"
+        print(f"[{time.perf_counter() - start:6.1f}s] "
+              f"{', '.join(f'{name}={describe(results.config[name])}' for name in varying) or 'defaults'}: "
+              f"{state} after {len(results.episodes)}", file=sys.stderr)
+
+    everything = sweep(configs, episodes, args.batch_size, args.tolerance, args.processes,
+                       width, height, args.max_ticks, progress)
+    elapsed = time.perf_counter() - start
+    played = sum(len(results.episodes) for results in everything)
+    print(f"{len(configs)} configurations, {played} episodes in {elapsed:.1f}s "
+          f"(at most {len(episodes)} each; * = didn't converge)", file=sys.stderr)
+    fixed = [f"{name}={describe(values[name][0])}" for name in KNOBS if name not in varying]
+    if fixed:
+        print(f"fixed: {', '.join(fixed)}", file=sys.stderr)
+
+    if args.jsonl:
+        for results in everything:
+            print(json.dumps(results.summary()))
+    else:
+        print_table(everything, varying)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())